@@ -1,15 +1,14 @@
 import streamlit as st
 import logging
 import os
-import random
+import sys
+import threading
+from functools import lru_cache
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.tools import tool
-from langchain_core.messages import ToolMessage
-from langgraph.func import entrypoint, task
-from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
-from mock_data import mock_data
+from sessions import SESSION_ID_RE, new_session_id, session_store
+
+# The LangChain/LangGraph/Gemini stack lives in shopping_agent, which is only
+# imported after the page has painted (see start_warm_up) or on first Send.
 
 # Suppress debug messages
 logging.getLogger().setLevel(logging.ERROR)
@@ -20,117 +19,6 @@ if not api_key:
     st.error("Missing GEMINI_API_KEY in environment variables.")
     st.stop()
 
-cart = []
-user_history = []
-
-#########################################
-# TOOL DEFINITIONS - CORE FEATURES
-#########################################
-@tool
-def show_all_products():
-    """Return all available products."""
-    return mock_data
-
-@tool
-def recommend_products(query: str):
-    """AI-powered product recommendations with smart filtering."""
-    gemini_response = model.invoke([
-        {"role": "system", "content": "Refine user query and extract key attributes."},
-        {"role": "user", "content": query}
-    ])
-    refined_query = gemini_response.content.strip().lower()
-
-    results = []
-    for category, products in mock_data.items():
-        for product in products:
-            if any(word in product["name"].lower() or word in product.get("description", "").lower() for word in refined_query.split()):
-                results.append(product)
-
-    if not results:
-        return f"No products found for: {query}"
-
-    st.session_state["recommendations"] = results[:3]
-    st.session_state["last_recommended_product"] = results[0]["name"] if results else None
-    
-    return "Here are some products you might like:\n\n" + "\n".join([f"🛍 **{prod['name']}** - {prod['price']}\n📄 {prod['description']}" for prod in results[:3]])
-
-@tool
-def add_to_cart(product_name: str = ""):
-    """Adds the last recommended product if none is specified."""
-    if not product_name and "last_recommended_product" in st.session_state:
-        product_name = st.session_state["last_recommended_product"]
-    if not product_name:
-        return "❌ Please specify a product to add to the cart."
-
-    for category, products in mock_data.items():
-        for product in products:
-            if product["name"].lower() == product_name.lower():
-                cart.append(product)
-                return f"✅ *{product_name}* has been added to your cart."
-    return f"❌ *{product_name}* not found."
-
-@tool
-def checkout(address: str, phone_no: str, card_no: str):
-    """Processes checkout and provides delivery time."""
-    if not cart:
-        return "❌ Your cart is empty. Please add items before checkout."
-    delivery_days = random.randint(2, 5)
-    total_price = sum(float(prod["price"].replace("$", "")) for prod in cart)
-    cart.clear()
-    return f"✅ Order placed! Your items will be delivered to {address} in {delivery_days} days. Total: *${total_price:.2f}*"
-
-# ✅ FIX: Define tools_by_name here!
-tools = [show_all_products, recommend_products, add_to_cart, checkout]
-tools_by_name = {tool.name: tool for tool in tools}
-
-#########################################
-# SYSTEM PROMPT
-#########################################
-system_prompt = """You are a friendly AI shopping assistant.
-- Help users find the right products based on their needs.
-- Provide smart recommendations with filtering.
-- Support adding products to cart and checkout with order details.
-- Ensure accurate responses and product availability.
-- If user confirms order then ask for address, number, card number then say "order succesfull😃 ! it will ship in X days"
-Ensure accuracy: Do not claim items exist if they are not in product catlog.
-
-"""
-
-
-#########################################
-# AGENT DEFINITION
-#########################################
-@task
-def call_model(messages):
-    response = model.bind_tools([show_all_products, recommend_products, add_to_cart, checkout]).invoke(
-        [{"role": "system", "content": system_prompt}] + messages
-    )
-    return response
-
-@task
-def call_tool(tool_call):
-    tool_fn = tools_by_name.get(tool_call["name"])
-    if tool_fn:
-        observation = tool_fn.invoke(tool_call["args"])
-        return ToolMessage(content=observation, tool_call_id=tool_call["id"])
-    return ToolMessage(content="Invalid tool call", tool_call_id=tool_call["id"])
-
-checkpointer = MemorySaver()
-
-@entrypoint(checkpointer=checkpointer)
-def agent(messages, previous):
-    if previous is not None:
-        messages = add_messages(previous[-10:], messages)
-    llm_response = call_model(messages).result()
-    while llm_response.tool_calls:
-        tool_results = [call_tool(tc).result() for tc in llm_response.tool_calls]
-        messages = add_messages(messages, [llm_response, *tool_results])
-        llm_response = call_model(messages).result()
-    messages = add_messages(messages, llm_response)
-    return entrypoint.final(value=llm_response, save=messages)
-
-model = ChatGoogleGenerativeAI(api_key=api_key, model="gemini-1.5-flash")
-
 #########################################
 # STREAMLIT UI (Chatbot)
 #########################################
@@ -220,21 +108,90 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-if "conversation" not in st.session_state:
-    st.session_state.conversation = []
-
-chat_container = st.container()
-with chat_container:
-    for msg in st.session_state.conversation:
-        msg_class = "user-msg" if msg["role"] == "user" else "assistant-msg"
-        st.markdown(f"<div class='{msg_class}'>{msg['content']}</div>", unsafe_allow_html=True)
-
-user_input = st.text_input("Enter your message:")
-if st.button("Send"):
-    st.session_state.conversation.append({"role": "user", "content": user_input})
-    response = agent.invoke(st.session_state.conversation, config={"configurable": {"thread_id": "user_session"}})
-    st.session_state.conversation.append({"role": "assistant", "content": response.content.strip()})
-    st.rerun()
+# The conversation id lives in the URL (?chat=...), so a reload or a server
+# restart picks up the same chat archive and agent thread
+chat_id = st.query_params.get("chat", "")
+if not SESSION_ID_RE.fullmatch(chat_id):
+    chat_id = st.query_params["chat"] = new_session_id()
+session = session_store.get(chat_id)
+agent_config = {"configurable": {"thread_id": session.thread_id, "session_id": session.session_id}}
+
+# Only the newest messages are rendered; "Load earlier" pages back through the archive
+PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "20"))
+
+# SHOW_CACHE_STATS=1 adds an expander with the agent's cache hit rates
+SHOW_CACHE_STATS = os.getenv("SHOW_CACHE_STATS") == "1"
+
+
+@lru_cache(maxsize=4096)
+def render_message(role, content):
+    msg_class = "user-msg" if role == "user" else "assistant-msg"
+    return f"<div class='{msg_class}'>{content}</div>"
+
+
+def load_earlier():
+    session.visible += PAGE_SIZE
+
+
+@st.fragment
+def chat():
+    """Message list, input and agent call. Sending reruns only this fragment."""
+    if session.visible is None:
+        session.visible = PAGE_SIZE
+    if len(session.history) > session.visible:
+        st.button(f"⬆️ Load earlier messages ({len(session.history) - session.visible} more)", on_click=load_earlier)
+
+    chat_container = st.container()
+    with chat_container:
+        for msg in session.history.tail(session.visible):
+            st.markdown(render_message(msg["role"], msg["content"]), unsafe_allow_html=True)
+
+    user_input = st.text_input("Enter your message:")
+    if st.button("Send"):
+        from shopping_agent import stream_agent
+        session.history.append("user", user_input)
+        with chat_container:
+            st.markdown(render_message("user", user_input), unsafe_allow_html=True)
+            progress = st.empty()
+            reply = st.empty()
+        streamed = ""
+        for kind, payload in stream_agent([{"role": "user", "content": user_input}], config=agent_config):
+            if kind == "tool":
+                icon = "⏳" if payload["status"] == "running" else "✔️"
+                progress.caption(f"{icon} {payload['tool'].replace('_', ' ')}")
+            elif kind == "token":
+                streamed += payload
+                reply.markdown(f"<div class='assistant-msg'>{streamed}</div>", unsafe_allow_html=True)
+            else:
+                response = payload
+        # The streamed reply already sits in the message list, so no rerun is needed
+        session.history.append("assistant", response.content.strip())
+        progress.empty()
+        reply.markdown(render_message("assistant", response.content.strip()), unsafe_allow_html=True)
+
+    # Only once the agent stack is loaded: this must not import it before paint
+    agent = sys.modules.get("shopping_agent")
+    if SHOW_CACHE_STATS and hasattr(agent, "cache_stats"):
+        with st.expander("Cache stats"):
+            st.json(agent.cache_stats())
+
+
+chat()
+
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    """Import and build the agent stack in the background, once per process."""
+    def warm_up():
+        import shopping_agent
+        shopping_agent.warm_up()
+    thread = threading.Thread(target=warm_up, name="agent-warm-up", daemon=True)
+    thread.start()
+    return thread
+
+# Runs after the page has painted, so a cold replica renders immediately and
+# the first Send usually finds the agent ready (WARM_UP_AGENT=0 to disable)
+if os.getenv("WARM_UP_AGENT", "1") == "1":
+    start_warm_up()
 
 
 # import streamlit as st
@@ -0,0 +1,77 @@
+"""Cold-start benchmark for the Streamlit app.
+
+Every measurement runs in a fresh interpreter so nothing is already imported:
+
+    python benchmark_startup.py            # median of 5 runs
+    python benchmark_startup.py --runs 10 --budget-ms 1500
+
+"import" rows time importing a single module. "first paint" times the first
+full run of app.py (title, CSS and chat history) under streamlit's AppTest,
+and reports whether the LangChain stack was imported during that run. Exits
+with status 1 if the first paint median exceeds --budget-ms.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"ms": (time.perf_counter() - start) * 1000}}))
+"""
+
+PAINT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file("app.py", default_timeout=120).run()
+print(json.dumps({
+    "ms": (time.perf_counter() - start) * 1000,
+    "errors": [str(e.value) for e in at.exception],
+    "langchain_loaded": "langchain_core" in sys.modules,
+}))
+"""
+
+MODULES = ["streamlit", "sessions", "catalog", "search_index", "shopping_agent"]
+
+
+def probe(code):
+    # A dummy key gets past the API key check; WARM_UP_AGENT=0 keeps the
+    # background warm-up from importing the agent during the paint measurement.
+    env = dict(os.environ, GEMINI_API_KEY=os.getenv("GEMINI_API_KEY") or "benchmark", WARM_UP_AGENT="0")
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    for module in MODULES:
+        times = [probe(IMPORT_PROBE.format(module=module))["ms"] for _ in range(args.runs)]
+        print(f"import {module:<16} {statistics.median(times):8.0f} ms")
+
+    results = [probe(PAINT_PROBE) for _ in range(args.runs)]
+    paint = statistics.median(r["ms"] for r in results)
+    print(f"first paint {'':<16} {paint:8.0f} ms")
+    print(f"langchain imported before paint: {any(r['langchain_loaded'] for r in results)}")
+    for error in {e for r in results for e in r["errors"]}:
+        print(f"app error: {error}")
+
+    if args.budget_ms is not None and paint > args.budget_ms:
+        print(f"❌ first paint {paint:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(text):
+    """Cache key for free-text queries: lowercased, whitespace collapsed."""
+    return " ".join(text.lower().split())
+
+
+def hash_key(value):
+    """Cache key for structured values: SHA-256 of their canonical JSON."""
+    blob = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LRUCache:
+    """Size-bounded LRU cache with a TTL and optional SQLite backing.
+
+    The SQLite table is bounded too: each write drops the least recently
+    written rows beyond max_size. Values must be JSON-serializable unless
+    custom dumps/loads are given.
+    """
+
+    def __init__(self, max_size=1024, ttl=None, path=None, dumps=json.dumps, loads=json.loads):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.dumps = dumps
+        self.loads = loads
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+            self._trim_db()
+            self._db.commit()
+
+    def __len__(self):
+        return len(self._items)
+
+    def _expiry(self):
+        return time.time() + self.ttl if self.ttl else None
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    entry = (row[1], self.loads(row[0]))
+                    self._store(key, entry)
+            if entry is not None and entry[0] is not None and entry[0] <= now:
+                self._delete(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        entry = (self._expiry(), value)
+        with self._lock:
+            self._store(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, self.dumps(value), entry[0]),
+                )
+                self._trim_db()
+                self._db.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache")
+                self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._items),
+        }
+
+    def _store(self, key, entry):
+        self._items[key] = entry
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_size:
+            self._items.popitem(last=False)
+
+    def _trim_db(self):
+        # A replaced row gets a new rowid, so rowid order is write order:
+        # keep the newest max_size rows and drop the rest, oldest first.
+        self._db.execute(
+            "DELETE FROM cache WHERE rowid <= (SELECT rowid FROM cache ORDER BY rowid DESC LIMIT 1 OFFSET ?)",
+            (self.max_size,),
+        )
+
+    def _delete(self, key):
+        self._items.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._db.commit()
+
+
+class Memo:
+    """Results of pure computations, keyed by (name, canonical args, version).
+
+    Entries live in a size-bounded LRUCache; bumping the version makes old
+    entries unreachable. Hits and misses are counted per name.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, max_size=1024):
+        self.cache = LRUCache(max_size=max_size)
+        self.counts = {}  # name -> [hits, misses]
+        self._lock = threading.Lock()
+
+    def lookup(self, name, args, version):
+        """Return (True, value) on a hit and (False, None) on a miss."""
+        value = self.cache.get(hash_key([name, args, version]), self._MISSING)
+        hit = value is not self._MISSING
+        with self._lock:
+            self.counts.setdefault(name, [0, 0])[0 if hit else 1] += 1
+        return (True, value) if hit else (False, None)
+
+    def store(self, name, args, version, value):
+        self.cache.set(hash_key([name, args, version]), value)
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        """{name: {"hits", "misses", "hit_rate"}}."""
+        with self._lock:
+            counts = {name: tuple(c) for name, c in self.counts.items()}
+        return {
+            name: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+            for name, (hits, misses) in counts.items()
+        }
@@ -0,0 +1,305 @@
+import csv
+import json
+import mmap
+import os
+import struct
+from array import array
+
+# Age groups are stored as a bitmask per product, one bit per group.
+AGE_GROUPS = ("Kids", "Teen", "Adult")
+AGE_BITS = {group.lower(): 1 << bit for bit, group in enumerate(AGE_GROUPS)}
+
+
+def parse_price(price):
+    """Convert a price like "$89" or 89.5 to integer cents."""
+    if isinstance(price, str):
+        price = price.strip().replace("$", "").replace(",", "")
+    return int(round(float(price) * 100))
+
+
+def check_row(row):
+    """Raise ValueError if row is not a product Catalog.add() can take."""
+    if not isinstance(row, dict) or not isinstance(row.get("name"), str) or not row["name"].strip():
+        raise ValueError(f"Product row without a name: {row!r}")
+    try:
+        parse_price(row.get("price"))
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError(f"Bad price {row.get('price')!r} for {row['name']!r}") from None
+
+
+def format_price(cents):
+    dollars, rem = divmod(cents, 100)
+    return f"${dollars}" if not rem else f"${dollars}.{rem:02d}"
+
+
+def parse_age_groups(text):
+    """Convert "Teen, Adult" to its bitmask."""
+    mask = 0
+    for part in (text or "").split(","):
+        mask |= AGE_BITS.get(part.strip().lower(), 0)
+    return mask
+
+
+def format_age_groups(mask):
+    return ", ".join(group for bit, group in enumerate(AGE_GROUPS) if mask & (1 << bit))
+
+
+def read_rows(path):
+    """Yield product dicts from a .jsonl, .json or .csv catalog file."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, encoding="utf-8", newline="") as f:
+        if ext == ".jsonl":
+            yield from (json.loads(line) for line in f if line.strip())
+        elif ext == ".csv":
+            yield from csv.DictReader(f)
+        elif ext == ".json":
+            data = json.load(f)
+            if isinstance(data, dict):  # mock_data shape: {category: [products]}
+                for category, products in data.items():
+                    for product in products:
+                        yield {"category": category, **product}
+            else:
+                yield from data
+        else:
+            raise ValueError(f"Unsupported catalog file: {path}")
+
+
+#########################################
+# Compiled binary catalog
+#########################################
+# Layout: header, a section table of (offset, length) pairs, then the sections,
+# each 8-byte aligned. Numeric columns are raw little-endian arrays; string
+# columns are an offsets array (count + 1 entries) followed by a UTF-8 blob.
+# The prebuilt indexes compiled next to a catalog use the same layout.
+MAGIC = b"SHOPCAT1"
+HEADER = struct.Struct("<8sQ")  # magic, row count
+SECTION = struct.Struct("<QQ")  # offset, length
+NUMERIC_COLUMNS = (("category_ids", "H"), ("price_cents", "q"), ("age_masks", "B"))
+STRING_COLUMNS = ("names", "descriptions", "image_urls")
+
+
+class StringColumn:
+    """Read-only list of strings decoded on access from a mapped buffer."""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
+def pack_strings(values):
+    """The two sections of a string column: offsets, then the UTF-8 blob."""
+    blobs = [v.encode("utf-8") for v in values]
+    offsets = array("Q", [0])
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return [offsets.tobytes(), b"".join(blobs)]
+
+
+def unpack_strings(offsets, blob):
+    return StringColumn(offsets.cast("Q"), blob)
+
+
+def write_sections(path, magic, count, sections):
+    """Write sections (bytes-like) to path in the compiled layout.
+
+    The file is written next to path and renamed over it, so processes that
+    have the old file mapped keep a consistent view.
+    """
+    sections = [memoryview(data).cast("B") for data in sections]
+    table, offset = [], HEADER.size + SECTION.size * len(sections)
+    for data in sections:
+        offset += -offset % 8
+        table.append((offset, len(data)))
+        offset += len(data)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(magic, count))
+        for entry in table:
+            f.write(SECTION.pack(*entry))
+        for (offset, _), data in zip(table, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp, path)
+
+
+def map_sections(path, magic, n_sections):
+    """Map a file written by write_sections; return (count, section memoryviews)."""
+    with open(path, "rb") as f:
+        buf = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    found, count = HEADER.unpack_from(buf)
+    if found != magic:
+        raise ValueError(f"Not a {magic.decode()} file: {path}")
+    sections = [
+        buf[offset:offset + length]
+        for offset, length in (SECTION.unpack_from(buf, HEADER.size + i * SECTION.size) for i in range(n_sections))
+    ]
+    return count, sections
+
+
+def index_path(catalog_path, kind):
+    """Where the prebuilt index of a kind ("bm25", "vectors", "names") sits next to a compiled catalog."""
+    return f"{catalog_path}.{kind}"
+
+
+def compile_catalog(catalog, path):
+    """Write catalog to path in the binary format read by Catalog.open()."""
+    sections = [json.dumps(catalog.categories).encode("utf-8")]
+    for name, typecode in NUMERIC_COLUMNS:
+        sections.append(array(typecode, getattr(catalog, name)).tobytes())
+    for name in STRING_COLUMNS:
+        sections += pack_strings(getattr(catalog, name))
+    write_sections(path, MAGIC, len(catalog), sections)
+
+
+class Catalog:
+    """Columnar product store: one array or list per field, indexed by SKU id."""
+
+    def __init__(self):
+        self.categories = []  # category id -> name
+        self.category_index = {}  # name -> category id
+        self.names = []
+        self.descriptions = []
+        self.image_urls = []
+        self.category_ids = array("H")
+        self.price_cents = array("q")
+        self.age_masks = array("B")
+        self.deleted = set()  # SKU ids removed by delete(); ids are never reused
+        self.version = 0  # bumped by whoever applies a batch of changes
+
+    @classmethod
+    def from_mock_data(cls, data):
+        catalog = cls()
+        for category, products in data.items():
+            for product in products:
+                catalog.add({"category": category, **product})
+        return catalog
+
+    @classmethod
+    def from_file(cls, path):
+        """Load a catalog from a .jsonl, .json or .csv file."""
+        catalog = cls()
+        for row in read_rows(path):
+            catalog.add(row)
+        return catalog
+
+    @classmethod
+    def open(cls, path):
+        """Map a compiled catalog (see compile_catalog) without copying it.
+
+        Columns are views over the shared page cache, so opening is near
+        instant and processes mapping the same file share its memory. The
+        result is read-only.
+        """
+        _, sections = map_sections(path, MAGIC, 1 + len(NUMERIC_COLUMNS) + 2 * len(STRING_COLUMNS))
+        catalog = cls()
+        catalog.categories = json.loads(bytes(sections[0]))
+        catalog.category_index = {name: i for i, name in enumerate(catalog.categories)}
+        for (name, typecode), section in zip(NUMERIC_COLUMNS, sections[1:]):
+            setattr(catalog, name, section.cast(typecode))
+        strings = sections[1 + len(NUMERIC_COLUMNS):]
+        for i, name in enumerate(STRING_COLUMNS):
+            setattr(catalog, name, unpack_strings(strings[2 * i], strings[2 * i + 1]))
+        return catalog
+
+    @classmethod
+    def load(cls, path):
+        """Open a compiled .bin catalog, or parse a .jsonl/.json/.csv one."""
+        return cls.open(path) if path.endswith(".bin") else cls.from_file(path)
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern_category(self, name):
+        cat_id = self.category_index.get(name)
+        if cat_id is None:
+            cat_id = self.category_index[name] = len(self.categories)
+            self.categories.append(name)
+        return cat_id
+
+    def add(self, product):
+        """Append a product dict and return its SKU id."""
+        sku = len(self.names)
+        price = parse_price(product["price"])  # before any column grows, so a bad row adds nothing
+        self.descriptions.append(product.get("description", ""))
+        self.image_urls.append(product.get("image_url", ""))
+        self.category_ids.append(self.intern_category(product.get("category", "")))
+        self.price_cents.append(price)
+        self.age_masks.append(parse_age_groups(product.get("age_group", "")))
+        self.names.append(product["name"])  # last: len(self) counts names, so readers see whole rows
+        return sku
+
+    def update(self, sku, product):
+        """Overwrite a SKU's fields in place, keeping its id."""
+        price = parse_price(product["price"])
+        self.names[sku] = product["name"]
+        self.descriptions[sku] = product.get("description", "")
+        self.image_urls[sku] = product.get("image_url", "")
+        self.category_ids[sku] = self.intern_category(product.get("category", ""))
+        self.price_cents[sku] = price
+        self.age_masks[sku] = parse_age_groups(product.get("age_group", ""))
+        self.deleted.discard(sku)
+
+    def delete(self, sku):
+        self.deleted.add(sku)
+
+    def live_skus(self):
+        return (sku for sku in range(len(self)) if sku not in self.deleted)
+
+    def category(self, sku):
+        return self.categories[self.category_ids[sku]]
+
+    def product(self, sku):
+        """Materialize a SKU as a product dict in the mock_data shape."""
+        return {
+            "name": self.names[sku],
+            "category": self.category(sku),
+            "price": format_price(self.price_cents[sku]),
+            "description": self.descriptions[sku],
+            "image_url": self.image_urls[sku],
+            "age_group": format_age_groups(self.age_masks[sku]),
+        }
+
+    def products(self, skus=None):
+        for sku in self.live_skus() if skus is None else skus:
+            yield self.product(sku)
+
+    def total_cents(self, skus):
+        prices = self.price_cents
+        return sum(prices[sku] for sku in skus)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from name_index import NameIndex
+    from search_index import SearchIndex
+    from semantic_index import SemanticIndex
+
+    parser = argparse.ArgumentParser(description="Compile a catalog and its indexes into memory-mapped binary files.")
+    parser.add_argument("source", nargs="?", help=".jsonl, .json or .csv catalog (default: mock_data)")
+    parser.add_argument("output", nargs="?", default="catalog.bin")
+    parser.add_argument("--semantic-dim", type=int, default=int(os.getenv("SEMANTIC_DIM", "1024")))
+    args = parser.parse_args()
+    if args.source:
+        source = Catalog.from_file(args.source)
+    else:
+        from mock_data import mock_data
+        source = Catalog.from_mock_data(mock_data)
+    compile_catalog(source, args.output)
+    # Written after the catalog, so they are never older than the catalog they index
+    products = list(source.products())
+    SearchIndex.from_products(products).save(index_path(args.output, "bm25"))
+    SemanticIndex.from_products(products, dim=args.semantic_dim).save(index_path(args.output, "vectors"))
+    NameIndex.from_names(source.names).save(index_path(args.output, "names"))
+    print(f"✅ Compiled {len(source)} products and their indexes to {args.output}")
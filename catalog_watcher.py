@@ -0,0 +1,105 @@
+import json
+import logging
+import os
+import threading
+
+from catalog import check_row, read_rows
+from name_index import normalize_name
+
+CATALOG_EXTENSIONS = (".jsonl", ".json", ".csv")
+
+
+class CatalogWatcher:
+    """Polls a catalog file or directory and reports which products changed.
+
+    Products are keyed by normalized name. After each poll that sees new file
+    mtimes, on_change(upserts, deletes) is called with the added or changed
+    product rows and the names of products that disappeared. Only a hash of
+    each row is remembered between polls.
+
+    Rows Catalog.add() would reject (no name, a price like "N/A") are logged
+    and skipped; a product whose row turns bad keeps its last good version
+    until the row is fixed.
+    """
+
+    def __init__(self, path, on_change, interval=30):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.snapshot = {}  # normalized name -> hash of the row
+        self._mtimes = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def files(self):
+        if not os.path.isdir(self.path):
+            return [self.path]
+        return sorted(
+            os.path.join(self.path, name)
+            for name in os.listdir(self.path)
+            if name.lower().endswith(CATALOG_EXTENSIONS)
+        )
+
+    def rows(self):
+        """Yield (key, row) for each product row; row is None if it is invalid."""
+        for path in self.files():
+            for row in read_rows(path):
+                try:
+                    check_row(row)
+                except ValueError as e:
+                    logging.warning("Skipping catalog row in %s: %s", path, e)
+                    name = row.get("name") if isinstance(row, dict) else None
+                    if isinstance(name, str) and name.strip():
+                        yield normalize_name(name), None
+                    continue
+                yield normalize_name(row["name"]), row
+
+    def prime(self):
+        """Read the current products without reporting them, and return them."""
+        self._mtimes = self._stat()
+        rows = [(key, row) for key, row in self.rows() if row is not None]
+        self.snapshot = {key: self._hash(row) for key, row in rows}
+        return [row for _, row in rows]
+
+    def poll(self):
+        """Report changes since the last poll; return True if any were found."""
+        mtimes = self._stat()
+        if mtimes == self._mtimes:
+            return False
+        snapshot, upserts = {}, []
+        for key, row in self.rows():
+            if row is None:
+                if key in self.snapshot:
+                    snapshot[key] = self.snapshot[key]  # keep the last good version
+                continue
+            snapshot[key] = digest = self._hash(row)
+            if self.snapshot.get(key) != digest:
+                upserts.append(row)
+        deletes = [key for key in self.snapshot if key not in snapshot]
+        if upserts or deletes:
+            self.on_change(upserts, deletes)  # re-applying after a failure is harmless
+        self._mtimes, self.snapshot = mtimes, snapshot
+        return bool(upserts or deletes)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="catalog-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                # A half-written file is retried on the next poll.
+                self._mtimes = None
+                logging.exception("Catalog reload failed")
+
+    def _stat(self):
+        return {path: os.stat(path).st_mtime_ns for path in self.files()}
+
+    @staticmethod
+    def _hash(row):
+        return hash(json.dumps(row, sort_keys=True, default=str))
@@ -0,0 +1,73 @@
+import json
+import os
+from array import array
+from collections import deque
+
+from redact import mask_text
+
+
+class ChatLog:
+    """Append-only chat history archived to a JSONL file.
+
+    Only the newest `keep` messages stay in memory. Older pages are read back
+    from disk by seeking to stored line offsets, so fetching a page costs the
+    same however long the session is. The file is created on first append,
+    and an existing file (e.g. from before a restart) is picked up again.
+    Card and phone numbers are masked (see redact) before a message is kept.
+    """
+
+    def __init__(self, path, keep=50):
+        self.path = path
+        self.recent = deque(maxlen=keep)  # newest {"role", "content"} messages
+        self.offsets = array("Q")  # byte offset of every archived line
+        self._size = 0
+        if os.path.exists(path):
+            self._reopen()
+
+    def _reopen(self):
+        with open(self.path, "rb+") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    f.truncate(self._size)  # torn final write
+                    break
+                self.offsets.append(self._size)
+                self._size += len(line)
+        self.recent.extend(self.page(max(0, len(self) - self.recent.maxlen), len(self)))
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, role, content):
+        message = {"role": role, "content": mask_text(content)}
+        line = (json.dumps(message, ensure_ascii=False) + "\n").encode()
+        if not self.offsets:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(line)
+        self.offsets.append(self._size)
+        self._size += len(line)
+        self.recent.append(message)
+
+    def tail(self, n):
+        """Return the last n messages, oldest first."""
+        n = min(n, len(self))
+        if n <= len(self.recent):
+            return list(self.recent)[len(self.recent) - n:]
+        return self.page(len(self) - n, len(self) - len(self.recent)) + list(self.recent)
+
+    def page(self, start, stop):
+        """Read messages [start, stop) from the archive."""
+        if start >= stop:
+            return []
+        end = self.offsets[stop] if stop < len(self) else self._size
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[start])
+            data = f.read(end - self.offsets[start])
+        return [json.loads(line) for line in data.splitlines()]
+
+    def delete(self):
+        self.recent.clear()
+        self.offsets = array("Q")
+        self._size = 0
+        if os.path.exists(self.path):
+            os.remove(self.path)
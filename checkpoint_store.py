@@ -0,0 +1,232 @@
+import atexit
+import os
+import sqlite3
+import threading
+
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+    writes_sort_key,
+)
+
+from redact import redact
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver):
+    """LangGraph checkpointer backed by a local SQLite database in WAL mode.
+
+    Checkpoints and writes are buffered in memory and committed in a single
+    transaction by flush(), which runs on every read, once flush_size rows are
+    buffered, and at exit. Only the latest keep_last checkpoints of each
+    thread are kept; older ones are deleted when their thread is flushed.
+    Threads are read from disk only when a run resumes them. Channel values
+    and writes go through redact() first, so card and phone numbers are
+    never written; the running graph keeps the real values.
+    """
+
+    def __init__(self, path, keep_last=3, flush_size=64, *, serde=None):
+        super().__init__(serde=serde)
+        self.keep_last = keep_last
+        self.flush_size = flush_size
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self._checkpoints = []  # buffered checkpoint rows
+        self._writes = []  # buffered (replace, write row)
+        atexit.register(self.flush)
+
+    #########################################
+    # Writes
+    #########################################
+    def put(self, config, checkpoint, metadata, new_versions):
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        type_, blob = self.serde.dumps_typed({**checkpoint, "channel_values": redact(checkpoint["channel_values"])})
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+        with self.lock:
+            self._checkpoints.append((
+                thread_id, checkpoint_ns, checkpoint["id"], configurable.get("checkpoint_id"),
+                type_, blob, metadata_type, metadata_blob,
+            ))
+            self._maybe_flush()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        configurable = config["configurable"]
+        key = (configurable["thread_id"], configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        with self.lock:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                type_, blob = self.serde.dumps_typed(redact(value))
+                # Special writes (negative idx) overwrite, regular ones are idempotent
+                self._writes.append((idx < 0, (*key, task_id, idx, channel, type_, blob, task_path)))
+            self._maybe_flush()
+
+    def _maybe_flush(self):
+        if len(self._checkpoints) + len(self._writes) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """Commit buffered rows and compact the threads they touched."""
+        with self.lock:
+            if not self._checkpoints and not self._writes:
+                return
+            touched = {(row[0], row[1]) for row in self._checkpoints}
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", self._checkpoints
+                )
+                for replace, row in self._writes:
+                    verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+                    self.conn.execute(f"{verb} INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+                for thread_id, checkpoint_ns in touched:
+                    self._compact(thread_id, checkpoint_ns)
+            self._checkpoints.clear()
+            self._writes.clear()
+
+    def _compact(self, thread_id, checkpoint_ns):
+        keep = """
+            SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?
+            ORDER BY checkpoint_id DESC LIMIT ?
+        """
+        args = (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.keep_last)
+        self.conn.execute(
+            f"DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})", args
+        )
+        self.conn.execute(
+            f"DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id NOT IN ({keep})", args
+        )
+
+    def delete_thread(self, thread_id):
+        with self.lock:
+            self.flush()
+            with self.conn:
+                self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+                self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+
+    #########################################
+    # Reads
+    #########################################
+    def thread_ids(self):
+        with self.lock:
+            self.flush()
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+
+    def get_tuple(self, config):
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        query = "SELECT * FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+        args = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            args.append(checkpoint_id)
+        query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self.lock:
+            self.flush()
+            row = self.conn.execute(query, args).fetchone()
+            return self._tuple(row) if row else None
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = "SELECT * FROM checkpoints"
+        clauses, args = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            args.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                args.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                args.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            args.append(before_id)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY checkpoint_id DESC"
+        with self.lock:
+            self.flush()
+            rows = self.conn.execute(query, args).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            tup = self._tuple(row)
+            if filter and not all(tup.metadata.get(k) == v for k, v in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield tup
+
+    def _tuple(self, row):
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, blob, metadata_type, metadata_blob = row
+        with self.lock:
+            writes = self.conn.execute(
+                "SELECT task_id, idx, channel, type, value, task_path FROM writes"
+                " WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        writes.sort(key=lambda w: writes_sort_key(w[5], w[0], w[1]))
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed((type_, blob)),
+            metadata=self.serde.loads_typed((metadata_type, metadata_blob)),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, _, channel, t, v, _ in writes],
+        )
+
+    #########################################
+    # Async API (SQLite calls are local and short, so run inline)
+    #########################################
+    async def aget_tuple(self, config):
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for tup in self.list(config, filter=filter, before=before, limit=limit):
+            yield tup
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        self.delete_thread(thread_id)
@@ -0,0 +1,116 @@
+import json
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, convert_to_messages
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD = 4  # role and framing tokens per message
+
+
+def count_text_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def count_tokens(message):
+    """Approximate prompt tokens for a message (about 4 characters per token)."""
+    tokens = MESSAGE_OVERHEAD + count_text_tokens(message.text)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += count_text_tokens(json.dumps([[tc["name"], tc["args"]] for tc in message.tool_calls]))
+    return tokens
+
+
+def canonical_message(message):
+    """A message's role, content and tool calls, without ids, for cache keys."""
+    canonical = {"role": message.type, "content": message.content}
+    if isinstance(message, AIMessage) and message.tool_calls:
+        canonical["tool_calls"] = [[tc["name"], tc["args"]] for tc in message.tool_calls]
+    return canonical
+
+
+def append_messages(history, new):
+    """Extend history in place with new messages, giving each an id if it has none.
+
+    Unlike add_messages this never scans history for ids to merge on, so it
+    costs O(len(new)). Only pass messages that are not already in history.
+    """
+    new = convert_to_messages(new)
+    for message in new:
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+    history.extend(new)
+    return history
+
+
+def split_turns(messages):
+    """Group messages into turns, each starting at a user message.
+
+    A turn's tool calls and tool results always stay together.
+    """
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def shrink_tool_output(message, max_tokens):
+    if not isinstance(message, ToolMessage) or count_text_tokens(message.text) <= max_tokens:
+        return message
+    clipped = message.text[:max_tokens * CHARS_PER_TOKEN].rstrip()
+    return message.model_copy(update={"content": clipped + " …[truncated]"})
+
+
+def clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def summarize_turn(turn):
+    user = next((m.text for m in turn if isinstance(m, HumanMessage)), "")
+    tools = [tc["name"] for m in turn if isinstance(m, AIMessage) for tc in m.tool_calls]
+    reply = next((m.text for m in reversed(turn) if isinstance(m, AIMessage) and not m.tool_calls), "")
+    line = f"- User: {clip(user, 120)}"
+    if tools:
+        line += f" (tools: {', '.join(dict.fromkeys(tools))})"
+    if reply:
+        line += f" → Assistant: {clip(reply, 160)}"
+    return line
+
+
+def fold_summary(summary, turns, max_tokens):
+    """Append one line per dropped turn, then keep only the newest lines within max_tokens."""
+    lines = [line for line in summary.splitlines() if line] + [summarize_turn(turn) for turn in turns]
+    kept, used = [], 0
+    for line in reversed(lines):
+        used += count_text_tokens(line) + 1
+        if used > max_tokens:
+            break
+        kept.append(line)
+    return "\n".join(reversed(kept))
+
+
+def build_context(messages, summary="", budget=4000, tool_output_tokens=300, summary_tokens=500):
+    """Fit the history into a token budget.
+
+    The current (last) turn is always kept whole. Tool outputs from earlier
+    turns are truncated to tool_output_tokens first. Then the oldest turns that
+    still don't fit are folded into the rolling summary. Returns the kept
+    messages and the updated summary.
+    """
+    turns = split_turns(messages)
+    if not turns:
+        return [], summary
+    current, past = turns[-1], turns[:-1]
+    past = [[shrink_tool_output(m, tool_output_tokens) for m in turn] for turn in past]
+    used = sum(map(count_tokens, current)) + count_text_tokens(summary)
+    start = len(past)
+    while start > 0:
+        cost = sum(map(count_tokens, past[start - 1]))
+        if used + cost > budget:
+            break
+        used += cost
+        start -= 1
+    if start:
+        summary = fold_summary(summary, past[:start], summary_tokens)
+    return [m for turn in past[start:] for m in turn] + current, summary
@@ -0,0 +1,185 @@
+import numpy as np
+
+from catalog import AGE_BITS, parse_age_groups, parse_price
+
+
+class FacetIndex:
+    """Price, category and age-group indexes for filtering before ranking.
+
+    Prices are kept sorted (with the SKU of each entry) so a price cap is a
+    binary search plus a slice. Categories and age groups are boolean bitmaps
+    over SKU ids, so filters combine with a vectorized AND. Updates replace
+    arrays (copy, change, assign) rather than change bits a reader can see,
+    so a filter running during a reload sees each array either before or
+    after a change. Only appended SKUs are written in place, past len(live).
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        n = len(catalog)
+        prices = np.array(catalog.price_cents, dtype=np.int64)
+        order = np.argsort(prices, kind="stable")
+        self.price_order = (prices[order], order)  # ascending prices, SKU of each
+        self._live = np.ones(n, dtype=bool)
+        self._live[list(catalog.deleted)] = False
+        self.live = self._live[:n]
+        category_ids = np.array(catalog.category_ids, dtype=np.int64)
+        self.categories = {cat_id: category_ids == cat_id for cat_id in range(len(catalog.categories))}
+        age_masks = np.array(catalog.age_masks, dtype=np.int64)
+        self.age_groups = {bit: (age_masks & bit) != 0 for bit in AGE_BITS.values()}
+
+    def __len__(self):
+        return len(self.live)
+
+    def _grow(self, n):
+        """Make room for n SKUs, doubling so a run of appends copies O(log n) times.
+
+        Category and age bitmaps may be longer than live; readers only look
+        at the first len(live) bits, and the bits past it are always False.
+        """
+        capacity = max(n, 2 * len(self._live))
+        for bitmaps in (self.categories, self.age_groups):
+            for key, bitmap in list(bitmaps.items()):
+                bitmaps[key] = self._resized(bitmap, capacity)
+        self._live = self._resized(self._live, capacity)
+
+    @staticmethod
+    def _resized(bitmap, n):
+        grown = np.zeros(n, dtype=bool)
+        grown[:len(bitmap)] = bitmap
+        return grown
+
+    @staticmethod
+    def _with(bitmap, skus, values, visible):
+        """bitmap with bits skus set to values.
+
+        Bits below visible may be under a reader, so changing any of them
+        copies the bitmap; bits at or past it are written in place.
+        """
+        shown = skus < visible
+        if (bitmap[skus[shown]] != values[shown]).any():
+            bitmap = bitmap.copy()
+        bitmap[skus] = values
+        return bitmap
+
+    def set(self, *skus):
+        """(Re)index SKUs from the catalog's current values.
+
+        Pass a whole batch at once: the price order is merged and each bitmap
+        copied at most once per call, not once per SKU.
+        """
+        if not skus:
+            return
+        skus = np.unique(np.array(skus, dtype=np.int64))
+        visible = len(self)
+        n = max(visible, int(skus[-1]) + 1)
+        if n > len(self._live):
+            self._grow(n)
+
+        prices, order = self.price_order
+        if skus[0] < visible:  # drop the old entries of re-indexed SKUs
+            stale = np.zeros(n, dtype=bool)
+            stale[skus] = True
+            keep = ~stale[order]
+            prices, order = prices[keep], order[keep]
+        new_prices = np.array([self.catalog.price_cents[sku] for sku in skus], dtype=np.int64)
+        by_price = np.argsort(new_prices, kind="stable")
+        new_prices, new_skus = new_prices[by_price], skus[by_price]
+        at = np.searchsorted(prices, new_prices, side="right")
+        self.price_order = (np.insert(prices, at, new_prices), np.insert(order, at, new_skus))
+
+        cat_ids = np.array([self.catalog.category_ids[sku] for sku in skus], dtype=np.int64)
+        for cat_id in np.unique(cat_ids).tolist():
+            if cat_id not in self.categories:
+                self.categories[cat_id] = np.zeros(len(self._live), dtype=bool)
+        for key, bitmap in list(self.categories.items()):
+            self.categories[key] = self._with(bitmap, skus, cat_ids == key, visible)
+        age_masks = np.array([self.catalog.age_masks[sku] for sku in skus], dtype=np.int64)
+        for bit, bitmap in list(self.age_groups.items()):
+            self.age_groups[bit] = self._with(bitmap, skus, (age_masks & bit) != 0, visible)
+        # live last: readers size their view by it, and the bitmaps are already that long
+        self._live = self._with(self._live, skus, np.ones(len(skus), dtype=bool), visible)
+        self.live = self._live[:n]
+
+    def remove(self, *skus):
+        if not skus:
+            return
+        skus = np.array(skus, dtype=np.int64)
+        self._live = self._with(self._live, skus, np.zeros(len(skus), dtype=bool), len(self))
+        self.live = self._live[:len(self)]
+
+    def filter(self, max_price=None, category=None, age_group=None):
+        """Bitmap of live SKUs matching every given filter, or None if none are given.
+
+        max_price is in dollars (or a "$49.99" string); category is matched
+        case-insensitively; age_group is "Kids", "Teen" or "Adult" and matches
+        products suitable for any of the named groups.
+        """
+        if max_price is None and not category and not age_group:
+            return None
+        allowed = self.live.copy()
+        n = len(allowed)  # bitmaps may grow while we read; use this length throughout
+        if max_price is not None:
+            prices, skus = self.price_order
+            skus = skus[:np.searchsorted(prices, parse_price(max_price), side="right")]
+            in_range = np.zeros(n, dtype=bool)
+            in_range[skus[skus < n]] = True
+            allowed &= in_range
+        if category:
+            bitmap = self.categories.get(self.category_id(category))
+            allowed &= bitmap[:n] if bitmap is not None else False
+        if age_group:
+            bits = parse_age_groups(age_group)
+            groups = [bitmap[:n] for bit, bitmap in self.age_groups.items() if bits & bit]
+            allowed &= np.logical_or.reduce(groups) if groups else False
+        return allowed
+
+    def category_id(self, name):
+        """Case-insensitive category lookup, or None."""
+        wanted = name.strip().casefold()
+        return next((cat_id for cat_id, cat in enumerate(self.catalog.categories) if cat.casefold() == wanted), None)
+
+    def category_stats(self):
+        """{category: (live product count, min price cents, max price cents)} for non-empty categories."""
+        live = self.live
+        prices, skus = self.price_order
+        skus_in_range = skus < len(live)
+        stats = {}
+        for cat_id, bitmap in list(self.categories.items()):
+            mask = bitmap[:len(live)] & live
+            selected = np.zeros(len(skus), dtype=bool)
+            selected[skus_in_range] = mask[skus[skus_in_range]]
+            count = int(selected.sum())
+            if count:
+                in_cat = prices[selected]
+                stats[self.catalog.categories[cat_id]] = (count, int(in_cat[0]), int(in_cat[-1]))
+        return stats
+
+    def page(self, start=0, limit=10, category=None):
+        """Live SKUs from SKU id start on (optionally in one category), up to limit.
+
+        Returns (skus, next_start); next_start is None on the last page.
+        """
+        allowed = self.live
+        if category is not None:
+            bitmap = self.categories.get(self.category_id(category))
+            if bitmap is None:
+                return [], None
+            allowed = bitmap[:len(allowed)] & allowed
+        skus = (np.flatnonzero(allowed[start:]) + start)[:limit + 1].tolist()
+        return skus[:limit], (skus[limit] if len(skus) > limit else None)
+
+    def cheapest(self, allowed, k=3, chunk=4096):
+        """The k cheapest SKUs in allowed, for filter-only queries.
+
+        Walks the price order a chunk at a time and stops once k are found.
+        """
+        found = []
+        skus = self.price_order[1]
+        for start in range(0, len(skus), chunk):
+            block = skus[start:start + chunk]
+            block = block[block < len(allowed)]
+            found += block[allowed[block]][:k - len(found)].tolist()
+            if len(found) == k:
+                break
+        return found
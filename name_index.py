@@ -0,0 +1,135 @@
+import heapq
+from array import array
+
+from catalog import map_sections, pack_strings, unpack_strings, write_sections
+
+MAGIC = b"SHOPNAME"
+
+
+def normalize_name(name):
+    """Case-fold a product name and collapse whitespace."""
+    return " ".join(name.casefold().split())
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance, or max_distance + 1 once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev = cur
+    return prev[-1]
+
+
+class NameIndex:
+    """Exact case-folded name -> SKU lookup with a trigram fuzzy fallback."""
+
+    def __init__(self, max_candidates=20):
+        self.max_candidates = max_candidates
+        self.exact = {}  # normalized name -> SKU id
+        self.keys = []  # SKU id -> normalized name
+        self.grams = {}  # trigram -> SKU ids whose name has it
+
+    @classmethod
+    def from_names(cls, names, **kwargs):
+        index = cls(**kwargs)
+        for sku, name in enumerate(names):
+            index.add(sku, name)
+        return index
+
+    @classmethod
+    def open(cls, path, **kwargs):
+        """Map an index written by save(); trigram lists stay views of the file."""
+        _, sections = map_sections(path, MAGIC, 6)
+        index = cls(**kwargs)
+        index.keys = unpack_strings(sections[0], sections[1])
+        index.exact = {index.keys[sku]: sku for sku in sections[2].cast("I")}
+        offsets, skus = sections[4].cast("Q"), sections[5].cast("I")
+        grams = str(sections[3], "utf-8")
+        index.grams = {grams[3 * i:3 * i + 3]: skus[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)}
+        return index
+
+    def save(self, path):
+        """Write the index to path (see catalog.write_sections) for open()."""
+        grams = list(self.grams)
+        offsets, skus = array("Q", [0]), array("I")
+        for gram in grams:
+            skus.extend(self.grams[gram])
+            offsets.append(len(skus))
+        write_sections(path, MAGIC, len(self), [
+            *pack_strings(self.keys), array("I", self.exact.values()),
+            "".join(grams).encode("utf-8"), offsets, skus,
+        ])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, sku, name):
+        key = normalize_name(name)
+        if len(self.keys) <= sku:
+            self.keys = list(self.keys) if not isinstance(self.keys, list) else self.keys
+            self.keys += [""] * (sku + 1 - len(self.keys))
+        if key in self.exact:
+            return  # Duplicate names resolve to the first SKU.
+        self.keys[sku] = key
+        self.exact[key] = sku
+        for gram in trigrams(key):
+            skus = self.grams.get(gram)
+            if skus is None:
+                self.grams[gram] = [sku]
+            elif isinstance(skus, list):
+                skus.append(sku)
+            else:  # a mapped view
+                self.grams[gram] = [*skus, sku]
+
+    def remove(self, sku, name):
+        key = normalize_name(name)
+        if self.exact.get(key) != sku:
+            return
+        del self.exact[key]
+        for gram in trigrams(key):
+            skus = self.grams.get(gram)
+            if skus is not None and sku in skus:
+                skus = [s for s in skus if s != sku]
+                if skus:
+                    self.grams[gram] = skus
+                else:
+                    del self.grams[gram]
+
+    def sku(self, name):
+        """Exact (normalized) name lookup, without the fuzzy fallback."""
+        return self.exact.get(normalize_name(name))
+
+    def lookup(self, name, max_distance=None):
+        """Return the SKU for name, falling back to the closest fuzzy match."""
+        key = normalize_name(name)
+        sku = self.exact.get(key)
+        if sku is not None or not key:
+            return sku
+        return self.closest(key, max_distance)
+
+    def closest(self, key, max_distance=None):
+        """SKU of the indexed name nearest to key, or None."""
+        if max_distance is None:
+            max_distance = min(3, 1 + len(key) // 6)
+        overlap = {}
+        for gram in trigrams(key):
+            for sku in self.grams.get(gram, ()):
+                overlap[sku] = overlap.get(sku, 0) + 1
+        candidates = heapq.nlargest(self.max_candidates, overlap, key=overlap.get)
+        best, best_distance = None, max_distance + 1
+        for sku in candidates:
+            distance = edit_distance(key, self.keys[sku], best_distance - 1)
+            if distance < best_distance:
+                best, best_distance = sku, distance
+        return best
@@ -0,0 +1,38 @@
+import re
+
+# Card numbers anywhere, phone numbers where they are labelled as one
+CARD_RE = re.compile(r"(?<![\w.-])\d(?:[ -]?\d){12,18}(?![\w-]|\.\d)")
+PHONE_RE = re.compile(r"(?P<label>\bphone(?:\s*(?:no|number))?\s*[:=]\s*)(?P<number>\+?\d[\d\s().-]{5,18}\d)", re.I)
+SECRET_ARGS = {"card_no", "phone_no"}
+
+
+def mask_number(number):
+    """Keep the last four digits: "4111 1111 1111 1111" -> "•••• 1111"."""
+    digits = re.sub(r"\D", "", str(number))
+    return f"•••• {digits[-4:]}" if len(digits) > 4 else "••••"
+
+
+def mask_text(text):
+    text = CARD_RE.sub(lambda m: mask_number(m[0]), text)
+    return PHONE_RE.sub(lambda m: m["label"] + mask_number(m["number"]), text)
+
+
+def redact(value):
+    """Copy of value with card and phone numbers masked, for writing to disk.
+
+    Walks dicts, lists, tuples and LangChain messages (matched by shape, so
+    the UI can use this without importing LangChain); card_no/phone_no
+    entries (tool call args) are masked whatever they look like.
+    """
+    if isinstance(value, str):
+        return mask_text(value)
+    if isinstance(value, dict):
+        return {k: mask_number(v) if k in SECRET_ARGS else redact(v) for k, v in value.items()}
+    if type(value) in (list, tuple):  # not namedtuples: their fields are positional
+        return type(value)(redact(v) for v in value)
+    if hasattr(value, "content") and hasattr(value, "model_copy"):
+        update = {"content": redact(value.content)}
+        if getattr(value, "tool_calls", None):
+            update["tool_calls"] = redact(value.tool_calls)
+        return value.model_copy(update=update)
+    return value
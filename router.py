@@ -0,0 +1,98 @@
+import re
+from typing import NamedTuple
+
+# Whole-message patterns for intents that need no model. Anything that does
+# not match one of these completely goes to Gemini.
+ADD_RE = re.compile(
+    r"^(?:please\s+)?(?:add|put)\s+(?P<item>.+?)"
+    r"(?:\s+(?:to|in|into)\s+(?:my\s+|the\s+)?(?:cart|basket|bag))?(?:\s+please)?\s*[.!]*$",
+    re.I,
+)
+IT = {"it", "that", "this", "this one", "that one", "the first one"}
+CART_RE = re.compile(
+    r"^(?:(?:show|view|see|open|check)\s+(?:me\s+)?)?(?:my\s+|the\s+)?(?:cart|basket)\s*[?.!]*$"
+    r"|^what(?:'s|\s+is)\s+in\s+(?:my|the)\s+(?:cart|basket)\s*[?.!]*$",
+    re.I,
+)
+CHECKOUT_RE = re.compile(
+    r"^(?:please\s+)?(?:i\s+want\s+to\s+|i'?d\s+like\s+to\s+|let'?s\s+)?"
+    r"(?:check\s*out|place\s+(?:my|the)\s+order)(?:\s+(?:now|please))?\s*[?.!]*$",
+    re.I,
+)
+# Checkout details are "label: value" fields; a value runs up to the next label
+CHECKOUT_FIELD_RE = re.compile(r"\b(?P<field>address|phone|card)(?:\s*(?:no|number))?\s*[:=]\s*", re.I)
+CHECKOUT_LEAD_RE = re.compile(
+    r"^(?:(?:please\s+)?(?:check\s*out|place\s+(?:my|the)\s+order)(?:\s+(?:with|using))?)?[\s:,;.-]*$", re.I
+)
+PHONE_RE = re.compile(r"\+?\d[\d\s().-]{5,18}\d")
+CARD_RE = re.compile(r"\d(?:[\s-]?\d){11,18}")
+CATEGORIES_RE = re.compile(
+    r"^(?:(?:list|show)(?:\s+me)?(?:\s+all)?(?:\s+the)?(?:\s+product)?\s+categories"
+    r"|what\s+(?:product\s+)?categories(?:\s+do\s+you\s+have)?)\s*[?.!]*$",
+    re.I,
+)
+CHECKOUT_DETAILS = "To place your order, please send your address, phone number and card number."
+
+
+class Route(NamedTuple):
+    intent: str
+    tool: str
+    args: dict
+
+
+def route(text, name_index):
+    """Match a high-confidence intent in a user message, or return None."""
+    text = " ".join(text.split())
+    if match := ADD_RE.match(text):
+        item = match["item"].strip(" \"'*")
+        if item.lower() in IT:
+            return Route("add_to_cart", "add_to_cart", {})
+        sku = name_index.lookup(item)
+        if sku is None:
+            item = re.sub(r"^(?:the|a|an|one)\s+", "", item, flags=re.I)
+            sku = name_index.lookup(item)
+        if sku is not None:
+            return Route("add_to_cart", "add_to_cart", {"product_name": item})
+        return None
+    if CART_RE.match(text):
+        return Route("show_cart", "show_cart", {})
+    if CATEGORIES_RE.match(text):
+        return Route("list_categories", "show_all_products", {})
+    # Labelled details ("address: ..., phone: ..., card: ...") are a checkout
+    # with or without the word, e.g. when answering CHECKOUT_DETAILS.
+    if details := checkout_details(text):
+        return Route("checkout", "checkout", details)
+    if CHECKOUT_RE.match(text):
+        return Route("checkout_details", "show_cart", {})
+    return None
+
+
+def checkout_details(text):
+    """Checkout tool args from a message that is only the three labelled fields, or None.
+
+    Placing an order can't be undone, so anything unexpected (other text,
+    a repeated or missing field, a phone or card number that doesn't look
+    like one) returns None and the message goes to the model instead.
+    """
+    labels = list(CHECKOUT_FIELD_RE.finditer(text))
+    if not labels or not CHECKOUT_LEAD_RE.match(text[:labels[0].start()]):
+        return None
+    fields = {}
+    for label, end in zip(labels, [m.start() for m in labels[1:]] + [len(text)]):
+        field = label["field"].lower()
+        value = re.sub(r"\s+and$", "", text[label.end():end].strip(" ,;."), flags=re.I)
+        if field in fields or not value:
+            return None
+        fields[field] = value
+    if fields.keys() != {"address", "phone", "card"}:
+        return None
+    if not PHONE_RE.fullmatch(fields["phone"]) or not CARD_RE.fullmatch(fields["card"]):
+        return None
+    return {"address": fields["address"], "phone_no": fields["phone"], "card_no": fields["card"]}
+
+
+def reply(route, result):
+    """Phrase the reply to a routed message from its tool result."""
+    if route.intent == "checkout_details" and not result.startswith("🛒 Your cart is empty"):
+        return f"{result}\n\n{CHECKOUT_DETAILS}"
+    return result
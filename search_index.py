@@ -0,0 +1,328 @@
+import json
+import math
+import re
+import heapq
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping
+from itertools import accumulate
+
+from catalog import map_sections, pack_strings, unpack_strings, write_sections
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+MAGIC = b"SHOPBM25"
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "i", "in",
+    "is", "it", "me", "my", "of", "on", "or", "that", "the", "this", "to",
+    "with", "you", "your",
+})
+
+
+def tokenize(text):
+    """Lowercase text and split it into searchable tokens."""
+    return [tok for tok in TOKEN_RE.findall(text.lower()) if tok not in STOPWORDS]
+
+
+def product_tokens(product, name_boost=2):
+    """Tokens for a product: name (boosted), description and category."""
+    name = tokenize(product["name"])
+    return (
+        name * name_boost
+        + tokenize(product.get("description", ""))
+        + tokenize(product.get("category", ""))
+    )
+
+
+def count_tokens(tokens):
+    counts = {}
+    for tok in tokens:
+        counts[tok] = counts.get(tok, 0) + 1
+    return counts
+
+
+def _spliced(values, i, value=None):
+    """A copy of a posting array with value inserted at i, or entry i dropped.
+
+    Lists are replaced rather than edited, so searches holding the old one
+    never see it shift under them.
+    """
+    values = memoryview(values)
+    spliced = array("I")
+    spliced.frombytes(values[:i].cast("B"))
+    if value is None:
+        i += 1
+    else:
+        spliced.append(value)
+    spliced.frombytes(values[i:].cast("B"))
+    return spliced
+
+
+class MappedPostings(MutableMapping):
+    """token -> (doc ids, term freqs) over a file mapped by SearchIndex.open().
+
+    Lists are sliced out of the mapped arrays on access. Assigned or deleted
+    tokens go to an overlay, so the mapping can still be edited like a dict.
+    """
+
+    _DELETED = None
+
+    def __init__(self, tokens, offsets, docs, tfs):
+        self.ids = dict(zip(tokens, range(len(tokens))))
+        self.offsets = offsets
+        self.docs = docs
+        self.tfs = tfs
+        self.overlay = {}  # token -> (docs, tfs), or _DELETED
+
+    def __getitem__(self, tok):
+        value = self.overlay.get(tok, self)
+        if value is self:
+            i = self.ids[tok]
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            return self.docs[start:stop], self.tfs[start:stop]
+        if value is self._DELETED:
+            raise KeyError(tok)
+        return value
+
+    def __setitem__(self, tok, value):
+        self.overlay[tok] = value
+
+    def __delitem__(self, tok):
+        self[tok]  # KeyError if absent
+        self.overlay[tok] = self._DELETED
+
+    def __iter__(self):
+        overlay = self.overlay
+        yield from (tok for tok in self.ids if overlay.get(tok, tok) is not self._DELETED)
+        yield from (tok for tok, value in overlay.items() if tok not in self.ids and value is not self._DELETED)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class SearchIndex:
+    """Inverted index over product text with BM25 ranking.
+
+    Posting lists are kept sorted by doc id, so documents can be removed and
+    re-added under the same id when a product changes. A list is only ever
+    appended to or replaced whole, so searches can run during updates.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # token -> (array of doc ids, array of term freqs)
+        self.max_tf = {}  # token -> highest term freq seen (an upper bound after removals)
+        self.doc_len = array("I")
+        self.total_len = 0
+        self.live = 0  # indexed documents, excluding removed ones
+        self.min_len = None  # shortest document added (a lower bound after removals)
+
+    @classmethod
+    def from_products(cls, products, **kwargs):
+        index = cls(**kwargs)
+        for product in products:
+            index.add(product_tokens(product))
+        return index
+
+    @classmethod
+    def open(cls, path):
+        """Map an index written by save().
+
+        Posting lists are views of the file, so processes mapping the same
+        file share them. The result is read-only.
+        """
+        _, sections = map_sections(path, MAGIC, 8)
+        params = json.loads(bytes(sections[0]))
+        index = cls(params["k1"], params["b"])
+        index.total_len, index.live, index.min_len = params["total_len"], params["live"], params["min_len"]
+        tokens = list(unpack_strings(sections[1], sections[2]))
+        index.postings = MappedPostings(tokens, sections[3].cast("Q"), sections[4].cast("I"), sections[5].cast("I"))
+        index.max_tf = dict(zip(tokens, sections[6].cast("I")))
+        index.doc_len.frombytes(sections[7])
+        return index
+
+    def save(self, path):
+        """Write the index to path (see catalog.write_sections) for open()."""
+        tokens = list(self.postings)
+        offsets, docs, tfs = array("Q", [0]), array("I"), array("I")
+        for tok in tokens:
+            tok_docs, tok_tfs = self.postings[tok]
+            docs.extend(tok_docs)
+            tfs.extend(tok_tfs)
+            offsets.append(len(docs))
+        params = {"k1": self.k1, "b": self.b, "total_len": self.total_len, "live": self.live, "min_len": self.min_len}
+        write_sections(path, MAGIC, len(self), [
+            json.dumps(params).encode("utf-8"), *pack_strings(tokens),
+            offsets, docs, tfs, array("I", (self.max_tf[tok] for tok in tokens)), self.doc_len,
+        ])
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, tokens, doc_id=None):
+        """Index a document's tokens and return its doc id.
+
+        Without doc_id the document is appended; pass the id of a removed
+        document to index its new text in place.
+        """
+        if doc_id is None:
+            doc_id = len(self.doc_len)
+        while len(self.doc_len) <= doc_id:
+            self.doc_len.append(0)
+        for tok, tf in count_tokens(tokens).items():
+            # The bound goes first, so a reader that finds the list finds it too
+            self.max_tf[tok] = max(self.max_tf.get(tok, 0), tf)
+            docs, tfs = self.postings.get(tok) or (array("I"), array("I"))
+            if isinstance(docs, array) and (not docs or docs[-1] < doc_id):
+                # Appending never moves existing entries; tfs first, so every
+                # doc id a reader sees already has its term freq
+                tfs.append(tf)
+                docs.append(doc_id)
+                self.postings[tok] = (docs, tfs)
+            else:
+                i = bisect_left(docs, doc_id)
+                self.postings[tok] = (_spliced(docs, i, doc_id), _spliced(tfs, i, tf))
+        self.doc_len[doc_id] = len(tokens)
+        self.total_len += len(tokens)
+        self.min_len = len(tokens) if self.min_len is None else min(self.min_len, len(tokens))
+        self.live += 1
+        return doc_id
+
+    def remove(self, doc_id, tokens):
+        """Unindex a document, given the tokens it was added with."""
+        for tok in count_tokens(tokens):
+            postings = self.postings.get(tok)
+            if not postings:
+                continue
+            docs, tfs = postings
+            i = bisect_left(docs, doc_id)
+            if i < len(docs) and docs[i] == doc_id:
+                if len(docs) == 1:
+                    del self.postings[tok]  # max_tf stays: readers may still hold the list
+                else:
+                    self.postings[tok] = (_spliced(docs, i), _spliced(tfs, i))
+        self.total_len -= self.doc_len[doc_id]
+        self.doc_len[doc_id] = 0
+        self.live -= 1
+
+    def idf(self, token):
+        postings = self.postings.get(token)
+        return self._idf(len(postings[0])) if postings else 0.0
+
+    def _idf(self, df):
+        return math.log(1 + (self.live - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=3, allowed=None):
+        """Return up to k (doc_id, score) pairs, best first.
+
+        allowed is an optional boolean sequence indexed by doc id; documents
+        where it is false or that it does not cover are skipped.
+        """
+        if not self.live or k <= 0:
+            return []
+        top = []  # min-heap of (score, -doc_id), at most k entries
+        for doc_id, score in self.candidates(query, allowed, lambda: top[0][0] if len(top) == k else 0.0):
+            entry = (score, -doc_id)
+            if len(top) < k:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+        # Ties keep catalog order.
+        return [(-neg_id, score) for score, neg_id in sorted(top, reverse=True)]
+
+    def candidates(self, query, allowed=None, threshold=lambda: 0.0):
+        """Yield (doc_id, score) for documents that can still reach the top k.
+
+        Document-at-a-time MaxScore: query terms are ordered by their score
+        upper bound, and once threshold() (the current k-th best score) exceeds
+        the summed bounds of the weakest terms, documents found only in
+        those terms are never visited and the rest are only probed in them
+        while they can still make the cut. Iteration stops when no unvisited
+        document can beat threshold().
+        """
+        k1, b = self.k1, self.b
+        avg_len = self.total_len / max(self.live, 1) or 1.0  # live/total_len move during a reload
+        doc_len = self.doc_len
+        base, slope = k1 * (1 - b), k1 * b / avg_len
+        terms = []
+        for tok in set(tokenize(query)):
+            postings = self.postings.get(tok)
+            if postings:
+                idf = self._idf(len(postings[0]))
+                max_tf = self.max_tf[tok]
+                bound = idf * (k1 + 1) * max_tf / (max_tf + base + slope * self.min_len)
+                terms.append((bound, idf, *postings))
+        terms.sort(key=lambda term: term[0])
+        bounds = list(accumulate(term[0] for term in terms))  # bounds[i]: terms[0..i] combined
+        cursors = [0] * len(terms)
+        essential = 0  # terms[essential:] are still walked; the rest are only probed
+
+        n_allowed = len(allowed) if allowed is not None else 0
+
+        def term_score(idf, tf, doc_id):
+            return idf * (k1 + 1) * tf / (tf + base + slope * doc_len[doc_id])
+
+        def probe(doc_id, score, floor):
+            """Add the weak terms' scores, or return None once the doc can't make it."""
+            for i in reversed(range(essential)):
+                if score + bounds[i] < floor:
+                    return None
+                _, idf, docs, tfs = terms[i]
+                j = cursors[i] = bisect_left(docs, doc_id, cursors[i])
+                if j < len(docs) and docs[j] == doc_id:
+                    score += term_score(idf, tfs[j], doc_id)
+            return score
+
+        # Merge the essential lists by doc id; entries of terms that became
+        # non-essential are dropped as they surface.
+        frontier = [(docs[0], i) for i, (_, _, docs, _) in enumerate(terms)]
+        heapq.heapify(frontier)
+        floor = threshold()  # only changes after a yield
+        while True:
+            while essential < len(terms) and bounds[essential] < floor:
+                essential += 1
+            if essential >= len(terms) - 1:
+                break
+            while frontier and frontier[0][1] < essential:
+                heapq.heappop(frontier)
+            if not frontier:
+                return
+            doc_id = frontier[0][0]
+            score = 0.0
+            while frontier and frontier[0][0] == doc_id:
+                i = frontier[0][1]
+                if i >= essential:
+                    _, idf, docs, tfs = terms[i]
+                    score += term_score(idf, tfs[cursors[i]], doc_id)
+                    cursors[i] += 1
+                    if cursors[i] < len(docs):
+                        heapq.heapreplace(frontier, (docs[cursors[i]], i))
+                        continue
+                heapq.heappop(frontier)
+            if allowed is not None and (doc_id >= n_allowed or not allowed[doc_id]):
+                continue
+            score = probe(doc_id, score, floor)
+            if score is not None and score >= floor:
+                yield doc_id, score
+                floor = threshold()
+
+        if essential == len(terms):
+            return
+        # One essential list left: walk it directly, probing the weak terms.
+        _, idf, docs, tfs = terms[-1]
+        scale = idf * (k1 + 1)
+        for j in range(cursors[-1], len(docs)):
+            doc_id = docs[j]
+            if allowed is not None and (doc_id >= n_allowed or not allowed[doc_id]):
+                continue
+            tf = tfs[j]
+            score = scale * tf / (tf + base + slope * doc_len[doc_id])
+            if essential:
+                if bounds[-1] < floor:
+                    return
+                score = probe(doc_id, score, floor)
+                if score is None:
+                    continue
+            if score >= floor:
+                yield doc_id, score
+                floor = threshold()
@@ -0,0 +1,190 @@
+import zlib
+from array import array
+
+import numpy as np
+
+from catalog import map_sections, write_sections
+from search_index import tokenize
+
+MAGIC = b"SHOPVEC1"
+
+# Query-side expansions so everyday wording reaches catalog vocabulary
+# ("warm jacket for my son" -> kids, winter, coat).
+SYNONYMS = {
+    "son": ["kids"], "daughter": ["kids"], "child": ["kids"], "children": ["kids"],
+    "boy": ["kids"], "girl": ["kids"], "toddler": ["kids"], "baby": ["kids"],
+    "teenager": ["teen"], "teens": ["teen"],
+    "jacket": ["coat"], "coat": ["jacket"], "parka": ["coat", "winter"],
+    "warm": ["winter", "insulated"], "cold": ["winter", "warm"],
+    "sneakers": ["shoes"], "trainers": ["shoes"], "sweatshirt": ["hoodie"],
+    "pants": ["trousers", "chinos"], "laptop": ["computer"], "phone": ["smartphone"],
+}
+
+
+def expand(tokens):
+    return tokens + [syn for tok in tokens for syn in SYNONYMS.get(tok, ())]
+
+
+def features(tokens, ngrams=(3, 4, 5)):
+    """Whole words plus character n-grams of each word, so near spellings overlap."""
+    feats = [f"w:{tok}" for tok in tokens]
+    for tok in tokens:
+        padded = f" {tok} "
+        for n in ngrams:
+            feats += [padded[i:i + n] for i in range(len(padded) - n + 1)]
+    return feats
+
+
+def product_text(product):
+    return " ".join([
+        product["name"], product["name"], product.get("description", ""),
+        product.get("category", ""), product.get("age_group", ""),
+    ])
+
+
+class SemanticIndex:
+    """Hashed TF-IDF vectors in one contiguous float32 matrix.
+
+    Every product is a unit-length row, so a query is scored against the whole
+    catalog with a single matrix-vector product and the top k are picked with
+    argpartition. The matrix is dense: len(products) * dim * 4 bytes (400 MB
+    for 100k products at dim 1024, 4 GB for 1M). A built matrix is private to
+    its process; one mapped by open() is shared through the page cache.
+
+    Rows can be re-embedded, zeroed or appended (IDF weights stay those of the
+    initial build); a mapped matrix is copied on the first such change.
+    """
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+        self.idf = np.ones(dim, dtype=np.float32)
+        self.matrix = self._buffer = np.zeros((0, dim), dtype=np.float32)
+
+    @classmethod
+    def from_products(cls, products, **kwargs):
+        return cls.from_texts([product_text(p) for p in products], **kwargs)
+
+    @classmethod
+    def from_texts(cls, texts, chunk=1024, **kwargs):
+        """Build the index, counting features a chunk of rows at a time.
+
+        Peak memory is the finished matrix plus one chunk's counts.
+        """
+        index = cls(**kwargs)
+        dim = index.dim
+        matrix = np.zeros((len(texts), dim), dtype=np.float32)
+        df = np.zeros(dim, dtype=np.int64)
+        cache = {}  # token -> buckets, only for the build: catalog words repeat a lot
+        for start in range(0, len(texts), chunk):
+            block = matrix[start:start + chunk]
+            lengths, cols = array("I"), array("I")
+            for text in texts[start:start + chunk]:
+                buckets = index._buckets(tokenize(text), cache)
+                lengths.append(len(buckets))
+                cols.extend(buckets)
+            rows = np.repeat(np.arange(len(block), dtype=np.int64), np.frombuffer(lengths, dtype=np.uint32))
+            flat = rows * dim + np.frombuffer(cols, dtype=np.uint32)
+            block[:] = np.bincount(flat, minlength=block.size).reshape(block.shape)
+            df += np.count_nonzero(block, axis=0)
+        index.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        for start in range(0, len(texts), chunk):
+            matrix[start:start + chunk] = index._weigh(matrix[start:start + chunk])
+        index.matrix = index._buffer = matrix
+        return index
+
+    @classmethod
+    def open(cls, path):
+        """Map an index written by save() without copying the matrix."""
+        count, (idf, matrix) = map_sections(path, MAGIC, 2)
+        index = cls(dim=len(idf) // 4)
+        index.idf = np.frombuffer(idf, dtype=np.float32)
+        index.matrix = index._buffer = np.frombuffer(matrix, dtype=np.float32).reshape(count, index.dim)
+        return index
+
+    def save(self, path):
+        """Write the index to path (see catalog.write_sections) for open()."""
+        write_sections(path, MAGIC, len(self), [self.idf, np.ascontiguousarray(self.matrix)])
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def _buckets(self, tokens, cache=None):
+        buckets = []
+        for tok in tokens:
+            cached = cache.get(tok) if cache is not None else None
+            if cached is None:
+                cached = [zlib.crc32(f.encode()) % self.dim for f in features([tok])]
+                if cache is not None:
+                    cache[tok] = cached
+            buckets += cached
+        return buckets
+
+    def _weigh(self, counts):
+        weights = np.log1p(counts, out=counts) * self.idf
+        norms = np.linalg.norm(weights, axis=-1, keepdims=True)
+        return np.divide(weights, norms, out=weights, where=norms > 0)
+
+    def _embed(self, tokens):
+        counts = np.zeros(self.dim, dtype=np.float32)
+        np.add.at(counts, self._buckets(tokens), 1.0)
+        return self._weigh(counts)
+
+    def encode(self, query):
+        return self._embed(expand(tokenize(query)))
+
+    def set(self, doc_id, product):
+        """Embed product into row doc_id, appending rows up to it if needed."""
+        row = self._embed(tokenize(product_text(product)))
+        n = max(len(self), doc_id + 1)
+        if n > len(self._buffer) or not self._buffer.flags.writeable:
+            # Grow geometrically; searches already running keep the old matrix.
+            buffer = np.zeros((max(n, 2 * len(self._buffer)), self.dim), dtype=np.float32)
+            buffer[:len(self)] = self.matrix
+            self._buffer = buffer
+        self._buffer[doc_id] = row
+        self.matrix = self._buffer[:n]
+
+    def remove(self, doc_id):
+        if not self.matrix.flags.writeable:
+            self._buffer = self.matrix = self.matrix.copy()
+        self.matrix[doc_id] = 0  # a zero row never reaches min_score
+
+    def search(self, query, k=3, min_score=0.15, allowed=None):
+        """Return up to k (doc_id, cosine) pairs scoring at least min_score, best first.
+
+        allowed is an optional boolean array over doc ids. When it admits at
+        most a fifth of the rows only those are gathered and scored; otherwise
+        every row is scored (as cheap as a gather at that size, and no copy)
+        and the rest are masked out.
+        """
+        matrix = self.matrix
+        if not len(matrix) or k <= 0:
+            return []
+        ids = None
+        if allowed is None:
+            scores = matrix @ self.encode(query)
+        else:
+            allowed = allowed[:len(matrix)]
+            ids = np.flatnonzero(allowed)
+            if len(ids) <= len(matrix) // 5:
+                scores = matrix[ids] @ self.encode(query)
+            else:
+                ids = None
+                scores = np.where(np.pad(allowed, (0, len(matrix) - len(allowed))), matrix @ self.encode(query), -np.inf)
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        # Ties keep catalog order.
+        top = sorted(top.tolist(), key=lambda i: (-scores[i], i))
+        return [(i if ids is None else int(ids[i]), float(scores[i])) for i in top if scores[i] >= min_score]
+
+
+def fuse(rankings, weights=None, k=3):
+    """Blend ranked [(doc_id, score)] lists by max-normalized, weighted score."""
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        top = max(score for _, score in ranking)
+        for doc_id, score in ranking:
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight * score / top
+    return sorted(fused.items(), key=lambda item: (-item[1], item[0]))[:k]
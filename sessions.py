@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+import time
+import uuid
+
+from chat_log import ChatLog
+
+SESSION_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+class Session:
+    """Per-conversation state: cart, chat history and agent thread.
+
+    The agent thread and the chat archive are named after the session id, so
+    a session re-created after a restart resumes both.
+    """
+
+    def __init__(self, session_id, archive_dir=".cache/chats", keep_messages=50):
+        self.session_id = session_id
+        self.thread_id = session_id
+        self.cart = []  # SKU ids
+        self.history = ChatLog(archive_path(archive_dir, session_id), keep=keep_messages)
+        self.visible = None  # how many messages the chat view shows; None means the default page
+        self.recommendations = []
+        self.last_recommended_product = None
+        self.last_seen = time.monotonic()
+        self.lock = threading.Lock()
+
+
+def archive_path(archive_dir, session_id):
+    return os.path.join(archive_dir, f"{session_id}.jsonl")
+
+
+class SessionStore:
+    """Sessions spread over independently locked shards, with idle eviction.
+
+    Evicted sessions have their chat archive deleted, then on_evict(session)
+    is called, e.g. to drop the checkpointed thread. Archives outlive the
+    process, so ones left idle while no process held them are removed by
+    expire_archives().
+    """
+
+    def __init__(self, shards=16, idle_ttl=2 * 3600, sweep_interval=60, on_evict=None,
+                 archive_dir=".cache/chats", keep_messages=50):
+        self.idle_ttl = idle_ttl
+        self.archive_dir = archive_dir
+        self.keep_messages = keep_messages
+        self.sweep_interval = sweep_interval
+        self.on_evict = on_evict
+        self._shards = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._last_sweep = [time.monotonic()] * shards
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def _shard_index(self, session_id):
+        return hash(session_id) % len(self._shards)
+
+    def get(self, session_id):
+        """Return the session for session_id, creating it on first use."""
+        i = self._shard_index(session_id)
+        now = time.monotonic()
+        evicted = []
+        with self._locks[i]:
+            shard = self._shards[i]
+            if now - self._last_sweep[i] >= self.sweep_interval:
+                evicted = self._sweep(i, now)
+            session = shard.get(session_id)
+            if session is None:
+                session = shard[session_id] = Session(session_id, self.archive_dir, self.keep_messages)
+            session.last_seen = now
+        self._notify(evicted)
+        return session
+
+    def pop(self, session_id):
+        i = self._shard_index(session_id)
+        with self._locks[i]:
+            session = self._shards[i].pop(session_id, None)
+        if session is not None:
+            self._notify([session])
+        return session
+
+    def evict_idle(self):
+        """Evict idle sessions from every shard and return how many were dropped."""
+        now = time.monotonic()
+        evicted = []
+        for i in range(len(self._shards)):
+            with self._locks[i]:
+                evicted += self._sweep(i, now)
+        self._notify(evicted)
+        return len(evicted)
+
+    def has_archive(self, session_id):
+        return os.path.exists(archive_path(self.archive_dir, session_id))
+
+    def expire_archives(self):
+        """Delete archives untouched for idle_ttl whose session is not in memory.
+
+        Returns the session ids whose archives were deleted.
+        """
+        try:
+            names = os.listdir(self.archive_dir)
+        except FileNotFoundError:
+            return []
+        cutoff = time.time() - self.idle_ttl
+        expired = []
+        for name in names:
+            session_id, ext = os.path.splitext(name)
+            if ext != ".jsonl" or self._shards[self._shard_index(session_id)].get(session_id):
+                continue
+            path = os.path.join(self.archive_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    expired.append(session_id)
+            except FileNotFoundError:
+                pass
+        return expired
+
+    def _sweep(self, i, now):
+        shard = self._shards[i]
+        idle = [sid for sid, session in shard.items() if now - session.last_seen > self.idle_ttl]
+        self._last_sweep[i] = now
+        return [shard.pop(sid) for sid in idle]
+
+    def _notify(self, sessions):
+        for session in sessions:
+            session.history.delete()
+            if self.on_evict:
+                self.on_evict(session)
+
+
+# Process-wide store shared by the UI and the agent tools. It lives here rather
+# than in shopping_agent so the UI can render history without importing the
+# LLM stack.
+session_store = SessionStore(
+    shards=int(os.getenv("SESSION_SHARDS", "16")),
+    idle_ttl=int(os.getenv("SESSION_IDLE_TTL", str(2 * 3600))),
+    archive_dir=os.getenv("CHAT_ARCHIVE_DIR", ".cache/chats"),
+    keep_messages=int(os.getenv("CHAT_KEEP_MESSAGES", "50")),
+)
+session_store.expire_archives()
@@ -0,0 +1,589 @@
+import asyncio
+import os
+import queue
+import random
+import threading
+import uuid
+from functools import cache
+from typing import Literal, Optional
+from dotenv import load_dotenv
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.tools import tool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.func import entrypoint, task
+from langgraph.config import get_stream_writer
+from langgraph.checkpoint.memory import MemorySaver
+from catalog import AGE_GROUPS, Catalog, format_price, index_path
+from catalog_watcher import CatalogWatcher
+from facets import FacetIndex
+from search_index import SearchIndex, product_tokens, tokenize
+from semantic_index import SYNONYMS, SemanticIndex, fuse
+from name_index import NameIndex
+from cache import LRUCache, Memo, hash_key, normalize_query
+from sessions import session_store
+from checkpoint_store import SQLiteCheckpointer
+from context import append_messages, build_context, canonical_message
+from router import reply, route
+from redact import redact
+
+# Everything here is built once per process: Streamlit re-executes app.py on
+# every interaction, but this module is imported only once.
+load_dotenv()
+
+# Agent checkpoints go to SQLite (set CHECKPOINT_PATH="" for in-memory only),
+# keeping the latest CHECKPOINT_KEEP_LAST per thread
+checkpoint_path = os.getenv("CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+if checkpoint_path:
+    checkpointer = SQLiteCheckpointer(checkpoint_path, keep_last=int(os.getenv("CHECKPOINT_KEEP_LAST", "3")))
+else:
+    checkpointer = MemorySaver()
+
+# Evicted sessions take their checkpointed thread with them. Threads are named
+# after their session, so a session resumed after a restart finds its thread;
+# threads whose chat archive has since expired are dropped here.
+session_store.on_evict = lambda session: checkpointer.delete_thread(session.thread_id)
+if isinstance(checkpointer, SQLiteCheckpointer):
+    for thread_id in checkpointer.thread_ids():
+        if not session_store.has_archive(thread_id):
+            checkpointer.delete_thread(thread_id)
+
+def session_for(config):
+    """Session of the conversation a tool is running in."""
+    return session_store.get(config["configurable"]["session_id"])
+
+# Columnar catalog and its search and name indexes, loaded once per process.
+# CATALOG_PATH points at a compiled .bin catalog (python catalog.py SOURCE OUT),
+# which is memory-mapped along with the indexes compiled next to it, or at a
+# bulk .jsonl/.json/.csv file whose indexes are built here. CATALOG_WATCH
+# instead names a catalog file or directory that is loaded, then polled every
+# CATALOG_WATCH_INTERVAL seconds for changed products.
+catalog_path = os.getenv("CATALOG_PATH")
+catalog_watch = os.getenv("CATALOG_WATCH")
+catalog_watcher = None
+
+def catalog_fingerprint(paths):
+    """Hash of the catalog files' sizes and mtimes, taken before they are read.
+
+    catalog.version restarts at 0 with every process, so keys that outlive
+    the process (a MODEL_CACHE_PATH) pair it with this.
+    """
+    stats = [(path, os.stat(path)) for path in paths]
+    return hash_key([(path, st.st_size, st.st_mtime_ns) for path, st in stats])
+
+if catalog_watch:
+    catalog_watcher = CatalogWatcher(
+        catalog_watch,
+        lambda upserts, deletes: apply_catalog_changes(upserts, deletes),
+        interval=float(os.getenv("CATALOG_WATCH_INTERVAL", "30")),
+    )
+    catalog_id = catalog_fingerprint(catalog_watcher.files())
+    catalog = Catalog()
+    for row in catalog_watcher.prime():
+        catalog.add(row)
+elif catalog_path:
+    catalog_id = catalog_fingerprint([catalog_path])
+    catalog = Catalog.load(catalog_path)
+else:
+    import mock_data
+    catalog_id = catalog_fingerprint([mock_data.__file__])
+    catalog = Catalog.from_mock_data(mock_data.mock_data)
+
+def open_index(cls, kind):
+    """Map the index compiled next to a .bin CATALOG_PATH, or None if it is missing or stale."""
+    if catalog_watch or not (catalog_path and catalog_path.endswith(".bin")):
+        return None
+    path = index_path(catalog_path, kind)
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(catalog_path):
+            return None
+        index = cls.open(path)
+    except (OSError, ValueError):
+        return None
+    return index if len(index) == len(catalog) else None
+
+# Mapped indexes are shared with every worker mapping the same files; a mapped
+# semantic index keeps the dim it was compiled with, whatever SEMANTIC_DIM says
+search_index = open_index(SearchIndex, "bm25")
+semantic_index = open_index(SemanticIndex, "vectors")
+name_index = open_index(NameIndex, "names")
+if search_index is None or semantic_index is None:
+    products = list(catalog.products())
+    if search_index is None:
+        search_index = SearchIndex.from_products(products)
+    if semantic_index is None:
+        semantic_index = SemanticIndex.from_products(products, dim=int(os.getenv("SEMANTIC_DIM", "1024")))
+    del products
+if name_index is None:
+    name_index = NameIndex.from_names(catalog.names)
+facet_index = FacetIndex(catalog)
+
+catalog_lock = threading.Lock()
+
+# Results of pure tools and of product search, per catalog version
+tool_memo = Memo(max_size=int(os.getenv("TOOL_CACHE_SIZE", "1024")))
+
+def apply_catalog_changes(upserts, deletes):
+    """Apply changed product rows and deleted product names to the catalog and its indexes.
+
+    Products are matched by name and keep their SKU ids, so carts stay valid.
+    Searches do not take catalog_lock: the indexes replace posting lists and
+    bitmaps whole (or only append to them) rather than editing them under a
+    reader. catalog.version is bumped once the batch is in, and also if it
+    fails part way, so no cached result outlives the rows already applied.
+    Rows are expected to have passed catalog.check_row (the watcher does it).
+    """
+    changed, removed = [], []
+    with catalog_lock:
+        try:
+            for row in upserts:
+                sku = name_index.sku(row["name"])
+                if sku is None:
+                    sku = catalog.add(row)
+                    name_index.add(sku, row["name"])
+                else:
+                    old_tokens = product_tokens(catalog.product(sku))
+                    catalog.update(sku, row)  # first: if it raises, the indexes still match
+                    search_index.remove(sku, old_tokens)
+                product = catalog.product(sku)
+                search_index.add(product_tokens(product), sku)
+                semantic_index.set(sku, product)
+                changed.append(sku)
+            for name in deletes:
+                sku = name_index.sku(name)
+                if sku is None:
+                    continue
+                search_index.remove(sku, product_tokens(catalog.product(sku)))
+                semantic_index.remove(sku)
+                removed.append(sku)
+                name_index.remove(sku, catalog.names[sku])
+                catalog.delete(sku)
+        finally:
+            # Once per batch: each call copies the price order and changed bitmaps
+            facet_index.set(*changed)
+            facet_index.remove(*removed)
+            catalog.version += 1
+            # Entries keyed on the old version can never hit again
+            model_cache.clear()
+            tool_memo.clear()
+
+# Hybrid ranking: BM25 for exact terms, hashed TF-IDF vectors for paraphrases
+# and misspellings. SEARCH_WEIGHTS is "bm25,semantic".
+SEARCH_WEIGHTS = [float(w) for w in os.getenv("SEARCH_WEIGHTS", "0.4,0.6").split(",")]
+SEARCH_CANDIDATES = 4  # candidates per ranker for every result returned
+# Words that only restate a price or age filter ("something under $50 for my son")
+FILTER_WORDS = frozenset({
+    "under", "below", "less", "than", "max", "budget", "cheap", "cheaper", "cheapest",
+    "price", "priced", "dollar", "dollars", "usd", "something", "anything", "products",
+    "items", "stuff", "kid", "year", "years", "old",
+    *(group.lower() for group in AGE_GROUPS),
+    *(word for word, syns in SYNONYMS.items() if {"kids", "teen"} & set(syns)),
+})
+MAX_RECOMMENDATIONS = 10
+
+def search_products(query, k=3, max_price=None, age_group=None, category=None):
+    """Return the SKUs of the k best matches for query among products passing the filters.
+
+    If the query only restates the filters (or is empty), the cheapest
+    filtered products are returned; a query that names something else and
+    matches nothing returns nothing. Results are memoized per catalog version.
+    """
+    args = {"query": normalize_query(query), "k": k, "max_price": max_price, "age_group": age_group, "category": category}
+    version = catalog.version
+    hit, skus = tool_memo.lookup("search_products", args, version)
+    if not hit:
+        skus = rank_products(query, k, max_price, age_group, category)
+        tool_memo.store("search_products", args, version, skus)
+    return list(skus)
+
+def rank_products(query, k, max_price, age_group, category):
+    n = k * SEARCH_CANDIDATES
+    allowed = facet_index.filter(max_price=max_price, category=category, age_group=age_group)
+    rankings = [search_index.search(query, k=n, allowed=allowed), semantic_index.search(query, k=n, allowed=allowed)]
+    skus = [sku for sku, _ in fuse(rankings, SEARCH_WEIGHTS, k=k)]
+    if not skus and allowed is not None and restates_filters(query, category):
+        skus = facet_index.cheapest(allowed, k=k)
+    return skus
+
+def restates_filters(query, category=None):
+    """True if query has no words beyond its filters: numbers, FILTER_WORDS, the category."""
+    words = FILTER_WORDS | set(tokenize(category or ""))
+    return all(tok.isdigit() or tok in words for tok in tokenize(query))
+
+# Gemini query refinements, only used when the model's own keywords match
+# nothing (REFINE_FALLBACK=0 turns them off). Shared across users and persisted
+# to disk (set REFINE_CACHE_PATH="" to keep them in memory only)
+REFINE_FALLBACK = os.getenv("REFINE_FALLBACK", "1") == "1"
+refine_cache = LRUCache(
+    max_size=int(os.getenv("REFINE_CACHE_SIZE", "2048")),
+    ttl=int(os.getenv("REFINE_CACHE_TTL", str(7 * 24 * 3600))),
+    path=os.getenv("REFINE_CACHE_PATH", ".cache/refinements.sqlite"),
+)
+
+#########################################
+# MODEL
+#########################################
+# One client per process, so its HTTP connection pool is kept alive and
+# reused across sessions instead of being rebuilt on every rerun
+@cache
+def get_model():
+    return ChatGoogleGenerativeAI(api_key=os.getenv("GEMINI_API_KEY"), model="gemini-1.5-flash")
+
+@cache
+def get_bound_model():
+    return get_model().bind_tools(tools)
+
+#########################################
+# TOOL DEFINITIONS - CORE FEATURES
+#########################################
+async def refine_query(query):
+    """Rewrite a shopping query with Gemini, reusing cached refinements."""
+    key = normalize_query(query)
+    refined = refine_cache.get(key)
+    if refined is None:
+        gemini_response = await get_model().ainvoke([
+            {"role": "system", "content": "Refine user query and extract key attributes."},
+            {"role": "user", "content": query}
+        ])
+        refined = gemini_response.content.strip().lower()
+        refine_cache.set(key, refined)
+    return refined
+
+@tool
+def show_all_products():
+    """Summarize the catalog: categories with product counts and price ranges.
+
+    Use browse_products to list the products in a category.
+    """
+    stats = facet_index.category_stats()
+    lines = [f"🗂 {sum(count for count, _, _ in stats.values())} products in {len(stats)} categories:"]
+    for name, (count, low, high) in stats.items():
+        lines.append(f"- **{name}**: {count} products, {format_price(low)}–{format_price(high)}")
+    return "\n".join(lines)
+
+BROWSE_FIELDS = ("name", "price", "category", "description", "age_group", "image_url")
+MAX_PAGE_SIZE = 50
+
+@tool
+def browse_products(
+    category: Optional[str] = None,
+    cursor: Optional[str] = None,
+    page_size: int = 10,
+    fields: Optional[list[str]] = None,
+):
+    """List catalog products a page at a time, optionally within one category.
+
+    Shows name and price unless other fields are asked for (any of name, price,
+    category, description, age_group, image_url). To get the next page, call
+    again with the cursor from the previous result.
+    """
+    fields = [f for f in fields or ("name", "price") if f in BROWSE_FIELDS] or ["name", "price"]
+    start = int(cursor) if cursor and cursor.isdigit() else 0
+    skus, next_start = facet_index.page(start, max(1, min(page_size, MAX_PAGE_SIZE)), category)
+    if not skus:
+        return f"No products found{f' in {category}' if category else ''}."
+    lines = [" | ".join(str(catalog.product(sku)[f]) for f in fields) for sku in skus]
+    if next_start is not None:
+        lines.append(f"More products: cursor={next_start}")
+    return "\n".join(lines)
+
+@tool
+async def recommend_products(
+    keywords: str,
+    config: RunnableConfig,
+    category: Optional[str] = None,
+    max_price: Optional[float] = None,
+    age_group: Optional[Literal["Kids", "Teen", "Adult"]] = None,
+    limit: int = 3,
+):
+    """AI-powered product recommendations with smart filtering.
+
+    keywords: the product attributes to search for, e.g. "warm winter coat"
+    (leave prices, ages and categories out; use the filters).
+    category: only this catalog category. max_price: budget in dollars.
+    age_group: who it is for. limit: how many products to return (at most 10).
+    """
+    k = max(1, min(limit, MAX_RECOMMENDATIONS))
+    filters = {"max_price": max_price, "age_group": age_group, "category": category}
+    # Ranking is CPU-bound; keep it off the event loop every session streams through
+    skus = await asyncio.to_thread(search_products, keywords, k=k, **filters)
+    if not skus and REFINE_FALLBACK and keywords.strip():
+        # Last resort: let Gemini rephrase keywords that matched nothing
+        skus = await asyncio.to_thread(search_products, await refine_query(keywords), k=k, **filters)
+    results = [catalog.product(sku) for sku in skus]
+
+    if not results:
+        return f"No products found for: {keywords}"
+
+    session = session_for(config)
+    session.recommendations = results
+    session.last_recommended_product = results[0]["name"]
+    
+    return "Here are some products you might like:\n\n" + "\n".join([f"🛍 **{prod['name']}** - {prod['price']}\n📄 {prod['description']}" for prod in results])
+
+@tool
+def add_to_cart(config: RunnableConfig, product_name: str = ""):
+    """Adds the last recommended product if none is specified."""
+    session = session_for(config)
+    if not product_name:
+        product_name = session.last_recommended_product
+    if not product_name:
+        return "❌ Please specify a product to add to the cart."
+
+    sku = name_index.lookup(product_name)
+    if sku is None:
+        return f"❌ *{product_name}* not found."
+    with session.lock:
+        session.cart.append(sku)
+    return f"✅ *{catalog.names[sku]}* has been added to your cart."
+
+@tool
+def show_cart(config: RunnableConfig):
+    """Show the items in the cart and their total."""
+    session = session_for(config)
+    with session.lock:
+        cart = list(session.cart)
+    if not cart:
+        return "🛒 Your cart is empty."
+    lines = [f"- {catalog.names[sku]} - {format_price(catalog.price_cents[sku])}" for sku in cart]
+    return "🛒 Your cart:\n" + "\n".join(lines) + f"\nTotal: *{format_price(catalog.total_cents(cart))}*"
+
+@tool
+def checkout(address: str, phone_no: str, card_no: str, config: RunnableConfig):
+    """Processes checkout and provides delivery time."""
+    session = session_for(config)
+    with session.lock:
+        if not session.cart:
+            return "❌ Your cart is empty. Please add items before checkout."
+        total_price = catalog.total_cents(session.cart) / 100
+        session.cart.clear()
+    delivery_days = random.randint(2, 5)
+    return f"✅ Order placed! Your items will be delivered to {address} in {delivery_days} days. Total: *${total_price:.2f}*"
+
+# ✅ FIX: Define tools_by_name here!
+tools = [show_all_products, browse_products, recommend_products, add_to_cart, show_cart, checkout]
+tools_by_name = {tool.name: tool for tool in tools}
+
+#########################################
+# SYSTEM PROMPT
+#########################################
+system_prompt = """You are a friendly AI shopping assistant.
+- Help users find the right products based on their needs.
+- Provide smart recommendations with filtering.
+- Support adding products to cart and checkout with order details.
+- Ensure accurate responses and product availability.
+- If user confirms order then ask for address, number, card number then say "order succesfull😃 ! it will ship in X days"
+Ensure accuracy: Do not claim items exist if they are not in product catlog.
+
+"""
+
+
+#########################################
+# AGENT DEFINITION
+#########################################
+# The agent is asyncio-native end to end. All runs share one event loop
+# thread per process; invoke_agent and stream_agent are thin sync wrappers
+# that hand work to it from Streamlit script threads.
+# Exact-match cache of model replies, keyed on everything the model sees plus
+# the catalog (its files' fingerprint and reload version). In memory by
+# default; MODEL_CACHE_SIZE=0 disables it.
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "512"))
+model_cache = LRUCache(
+    max_size=MODEL_CACHE_SIZE,
+    ttl=int(os.getenv("MODEL_CACHE_TTL", str(24 * 3600))),
+    path=os.getenv("MODEL_CACHE_PATH") or None,
+)
+
+@cache
+def tool_schemas_key():
+    return hash_key([convert_to_openai_tool(t) for t in tools])
+
+def model_cache_key(system, messages):
+    return hash_key({
+        "system": system,
+        "tools": tool_schemas_key(),
+        "messages": [canonical_message(m) for m in messages],
+        "catalog": [catalog_id, catalog.version],
+    })
+
+def replay(cached):
+    """Rebuild a cached reply; tool calls get fresh ids so history stays unique."""
+    tool_calls = [{**tc, "id": f"call_{uuid.uuid4().hex}"} for tc in cached["tool_calls"]]
+    return AIMessage(content=cached["content"], tool_calls=tool_calls)
+
+@task
+async def call_model(messages, summary=""):
+    system = system_prompt + (f"\nEarlier in this conversation:\n{summary}\n" if summary else "")
+    key = model_cache_key(system, messages) if MODEL_CACHE_SIZE else None
+    if key and (cached := model_cache.get(key)) is not None:
+        return replay(cached)
+    response = await get_bound_model().ainvoke(
+        [{"role": "system", "content": system}] + messages
+    )
+    if key and (response.content or response.tool_calls):
+        tool_calls = [{"name": tc["name"], "args": tc["args"]} for tc in response.tool_calls]
+        entry = {"content": response.content, "tool_calls": tool_calls}
+        if redact(entry) == entry:  # replies carrying card or phone numbers are not kept
+            model_cache.set(key, entry)
+    return response
+
+# Prompt history is fitted into CONTEXT_TOKEN_BUDGET; older tool outputs are
+# truncated first, then the oldest turns are folded into a rolling summary
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "4000"))
+TOOL_OUTPUT_TOKENS = int(os.getenv("TOOL_OUTPUT_TOKENS", "300"))
+
+def fit_context(messages, summary):
+    return build_context(messages, summary, budget=CONTEXT_TOKEN_BUDGET, tool_output_tokens=TOOL_OUTPUT_TOKENS)
+
+# Tool calls from one model turn run concurrently, bounded by
+# TOOL_MAX_CONCURRENCY, and each is cut off after its timeout (seconds)
+TOOL_MAX_CONCURRENCY = int(os.getenv("TOOL_MAX_CONCURRENCY", "4"))
+DEFAULT_TOOL_TIMEOUT = 15
+TOOL_TIMEOUTS = {"recommend_products": 30}
+
+# Whether each tool's output depends only on its arguments and the catalog.
+# Pure tools are memoized per catalog version; impure (and undeclared) ones
+# always run.
+TOOL_PURITY = {
+    "show_all_products": True,
+    "browse_products": True,
+    "recommend_products": False,  # records recommendations on the session; its search is memoized
+    "add_to_cart": False,
+    "show_cart": False,
+    "checkout": False,
+}
+
+@task
+async def call_tool(tool_call):
+    tool_fn = tools_by_name.get(tool_call["name"])
+    if tool_fn:
+        name, args = tool_call["name"], tool_call["args"]
+        pure, version = TOOL_PURITY.get(name, False), catalog.version
+        hit, observation = tool_memo.lookup(name, args, version) if pure else (False, None)
+        if not hit:
+            timeout = TOOL_TIMEOUTS.get(name, DEFAULT_TOOL_TIMEOUT)
+            try:
+                observation = await asyncio.wait_for(tool_fn.ainvoke(args), timeout)
+                if pure:
+                    tool_memo.store(name, args, version, observation)
+            except TimeoutError:
+                observation = f"❌ {name} timed out. Please try again."
+        return ToolMessage(content=observation, tool_call_id=tool_call["id"])
+    return ToolMessage(content="Invalid tool call", tool_call_id=tool_call["id"])
+
+# Messages the router recognises (add to cart, show cart, checkout, list
+# categories) run their tool directly and get a templated reply, skipping
+# Gemini. LOCAL_ROUTER=0 sends everything to the model.
+LOCAL_ROUTER = os.getenv("LOCAL_ROUTER", "1") == "1"
+
+def route_turn(new_messages):
+    """Route for this turn's user message, if it is a single routable one."""
+    if not LOCAL_ROUTER or len(new_messages) != 1:
+        return None
+    message = new_messages[0]
+    if message.type != "human":
+        return None
+    return route(message.text, name_index)
+
+@entrypoint(checkpointer=checkpointer)
+async def agent(messages, previous):
+    # Callers send only this turn's new messages; history comes from the checkpoint
+    previous = previous or {"messages": [], "summary": ""}
+    new_messages = append_messages([], messages)
+    messages = append_messages(previous["messages"], new_messages)
+    summary = previous["summary"]
+    writer = get_stream_writer()
+    semaphore = asyncio.Semaphore(TOOL_MAX_CONCURRENCY)
+
+    async def run_tool(tool_call):
+        async with semaphore:
+            writer({"tool": tool_call["name"], "status": "running"})
+            result = await call_tool(tool_call)
+            writer({"tool": tool_call["name"], "status": "done"})
+            return result
+
+    if routed := route_turn(new_messages):
+        # Recorded as a normal tool call so later model turns see it in history
+        tool_call = {"name": routed.tool, "args": routed.args, "id": f"routed-{new_messages[0].id}"}
+        tool_result = await run_tool(tool_call)
+        llm_response = AIMessage(content=reply(routed, tool_result.text))
+        messages = append_messages(messages, [AIMessage(content="", tool_calls=[tool_call]), tool_result, llm_response])
+        messages, summary = fit_context(messages, summary)
+        return entrypoint.final(value=llm_response, save={"messages": messages, "summary": summary})
+
+    messages, summary = fit_context(messages, summary)
+    llm_response = await call_model(messages, summary)
+    while llm_response.tool_calls:
+        # Dispatch every tool call at once; gather keeps the call order
+        tool_results = await asyncio.gather(*(run_tool(tc) for tc in llm_response.tool_calls))
+        messages = append_messages(messages, [llm_response, *tool_results])
+        messages, summary = fit_context(messages, summary)
+        llm_response = await call_model(messages, summary)
+    messages = append_messages(messages, [llm_response])
+    return entrypoint.final(value=llm_response, save={"messages": messages, "summary": summary})
+
+def flush_checkpoints():
+    """Commit the checkpoints buffered during a turn in one transaction."""
+    if isinstance(checkpointer, SQLiteCheckpointer):
+        checkpointer.flush()
+
+@cache
+def get_agent_loop():
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, name="agent-loop", daemon=True).start()
+    return loop
+
+def invoke_agent(messages, config):
+    """Run the agent to completion and return its final AIMessage."""
+    response = asyncio.run_coroutine_threadsafe(agent.ainvoke(messages, config=config), get_agent_loop()).result()
+    flush_checkpoints()
+    return response
+
+async def astream_agent(messages, config):
+    """Run the agent, yielding ("tool", event) progress updates and ("token", text)
+    chunks of the model's replies, then ("final", AIMessage) once it is done."""
+    final = None
+    # subgraphs=True surfaces token chunks from inside the call_model task
+    stream = agent.astream(messages, config=config, stream_mode=["custom", "messages", "values"], subgraphs=True)
+    async for namespace, mode, payload in stream:
+        if mode == "custom":
+            yield "tool", payload
+        elif mode == "messages":
+            chunk, metadata = payload
+            # Skip tokens from the model call nested inside recommend_products
+            if metadata.get("langgraph_node") == "call_model" and chunk.text:
+                yield "token", chunk.text
+        elif not namespace:
+            final = payload
+    flush_checkpoints()
+    yield "final", final
+
+def stream_agent(messages, config):
+    """Sync iterator over astream_agent's events."""
+    events = queue.Queue()
+
+    async def pump():
+        try:
+            async for event in astream_agent(messages, config):
+                events.put(event)
+        finally:
+            events.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), get_agent_loop())
+    while (event := events.get()) is not None:
+        yield event
+    future.result()  # re-raise any error from the run
+
+def cache_stats():
+    """Hit rates of the model reply cache, the refinement cache and each memoized tool."""
+    return {"model": model_cache.stats(), "refine": refine_cache.stats(), "tools": tool_memo.stats()}
+
+def warm_up():
+    """Build the model client, bound runnable and agent loop ahead of the first request."""
+    get_bound_model()
+    get_agent_loop()
+
+# Started last, so a reload never runs before the caches it invalidates exist
+if catalog_watcher:
+    catalog_watcher.start()
@@ -0,0 +1,83 @@
+import pytest
+
+from name_index import NameIndex
+from router import route
+
+NAMES = NameIndex.from_names(["Casual Hoodie", "Kids Winter Coat", "Performance Polo"])
+
+
+def intent(text):
+    match = route(text, NAMES)
+    return match and match.intent
+
+
+@pytest.mark.parametrize("text", [
+    "checkout",
+    "Check out",
+    "I want to check out",
+    "I'd like to checkout now.",
+    "let's check out!",
+    "place my order please",
+])
+def test_checkout_phrases(text):
+    assert intent(text) == "checkout_details"
+
+
+@pytest.mark.parametrize("text", [
+    "Check out this jacket, is it warm enough for winter?",
+    "Let's check out some hoodies",
+    "checkout the new arrivals",
+    "I want to check out the kids section",
+    "place my order for two hoodies and a polo",
+])
+def test_checkout_words_inside_other_requests_go_to_the_model(text):
+    assert intent(text) is None
+
+
+@pytest.mark.parametrize("text, address", [
+    ("address: 12 Main St, Springfield, IL, phone: 555-123-4567, card: 4111 1111 1111 1111",
+     "12 Main St, Springfield, IL"),
+    ("Checkout with address = 5 Elm Rd, Apt 3; phone number: +1 (555) 987-6543; card no: 4111-1111-1111-1111.",
+     "5 Elm Rd, Apt 3"),
+    ("card: 4111111111111111 address: Flat 2, 9 High St, London phone: 020 7946 0958",
+     "Flat 2, 9 High St, London"),
+])
+def test_checkout_fields_keep_commas_in_values(text, address):
+    match = route(text, NAMES)
+    assert match.intent == "checkout"
+    assert match.args["address"] == address
+    assert set(match.args) == {"address", "phone_no", "card_no"}
+
+
+def test_checkout_field_values():
+    match = route("address: 1 Card Street, Leeds, phone: 0113 496 0000 and card: 5500 0000 0000 0004", NAMES)
+    assert match.args == {
+        "address": "1 Card Street, Leeds", "phone_no": "0113 496 0000", "card_no": "5500 0000 0000 0004",
+    }
+
+
+@pytest.mark.parametrize("text", [
+    "address: 12 Main St, Springfield, phone: 555-123-4567",  # no card
+    "address: 12 Main St, phone: 555-123-4567, card: 4111 1111 1111 1111, and gift wrap it please",
+    "address: 12 Main St, phone: call me maybe, card: 4111 1111 1111 1111",
+    "address: 12 Main St, phone: 555-123-4567, card: 1234",
+    "address: 12 Main St, address: 3 Oak Ave, phone: 555-123-4567, card: 4111 1111 1111 1111",
+    "Should I put address: 12 Main St, phone: 555-123-4567, card: 4111 1111 1111 1111 here?",
+    "address: , phone: 555-123-4567, card: 4111 1111 1111 1111",
+])
+def test_unclear_checkout_details_go_to_the_model(text):
+    assert intent(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("add casual hoodie to my cart", "add_to_cart"),
+    ("add it", "add_to_cart"),
+    ("add a flying carpet to my cart", None),
+    ("show my cart", "show_cart"),
+    ("what's in my basket?", "show_cart"),
+    ("list categories", "list_categories"),
+    ("what categories do you have?", "list_categories"),
+    ("recommend a warm coat for my son", None),
+])
+def test_other_routes(text, expected):
+    assert intent(text) == expected
@@ -0,0 +1,97 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from search_index import SearchIndex, tokenize
+
+WORDS = [f"w{i}" for i in range(60)]
+
+
+def random_doc(rng):
+    # Skewed word choice, so some terms are common and some rare
+    return [WORDS[min(int(rng.expovariate(0.1)), len(WORDS) - 1)] for _ in range(rng.randint(1, 20))]
+
+
+def random_query(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(1, 5))]
+    words += rng.sample(["the", "for", "unknown", words[0]], rng.randint(0, 2))
+    return " ".join(words)
+
+
+def brute_force(docs, query, k, allowed=None, k1=1.2, b=0.75):
+    """Top k (doc_id, score) by scoring every live document with BM25."""
+    live = {doc_id: Counter(tokens) for doc_id, tokens in docs.items() if tokens is not None}
+    avg_len = sum(len(tokens) for tokens in docs.values() if tokens is not None) / len(live)
+    scores = Counter()
+    for tok in set(tokenize(query)):
+        df = sum(tok in counts for counts in live.values())
+        idf = math.log(1 + (len(live) - df + 0.5) / (df + 0.5))
+        for doc_id, counts in live.items():
+            tf = counts[tok]
+            if tf and (allowed is None or (doc_id < len(allowed) and allowed[doc_id])):
+                length = sum(counts.values())
+                scores[doc_id] += idf * (k1 + 1) * tf / (tf + k1 * (1 - b + b * length / avg_len))
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+def assert_same_top(got, expected):
+    # Equal scores may come out in either order, so compare scores, then each doc's score
+    assert [score for _, score in got] == pytest.approx([score for _, score in expected])
+    expected_scores = dict(expected)
+    for doc_id, score in got:
+        assert doc_id in expected_scores or score == pytest.approx(expected[-1][1])
+
+
+def build(rng, n=400):
+    docs = {}
+    index = SearchIndex()
+    for _ in range(n):
+        tokens = random_doc(rng)
+        docs[index.add(tokens)] = tokens
+    return index, docs
+
+
+def update(rng, index, docs):
+    """Re-index, remove and append documents in place."""
+    for doc_id in rng.sample(sorted(docs), 60):
+        if docs[doc_id] is None:
+            continue
+        index.remove(doc_id, docs[doc_id])
+        docs[doc_id] = None
+        if rng.random() < 0.7:
+            docs[doc_id] = random_doc(rng)
+            index.add(docs[doc_id], doc_id)
+    for _ in range(40):
+        tokens = random_doc(rng)
+        docs[index.add(tokens)] = tokens
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("mapped", [False, True])
+def test_candidates_match_brute_force(seed, mapped, tmp_path):
+    rng = random.Random(seed)
+    index, docs = build(rng)
+    if mapped:
+        path = tmp_path / "index.bm25"
+        index.save(path)
+        index = SearchIndex.open(path)
+
+    for round_ in range(3):
+        if round_:
+            update(rng, index, docs)
+        for _ in range(30):
+            query = random_query(rng)
+            k = rng.choice([1, 3, 10, 50])
+            allowed = None
+            if rng.random() < 0.5:
+                # Sometimes shorter than the index: uncovered doc ids are not allowed
+                allowed = [rng.random() < 0.3 for _ in range(rng.randint(len(docs) // 2, len(docs)))]
+            assert_same_top(index.search(query, k=k, allowed=allowed), brute_force(docs, query, k, allowed))
+
+
+def test_candidates_without_matches():
+    index, docs = build(random.Random(0), n=50)
+    assert index.search("nothing here", k=5) == []
+    assert index.search("w0", k=5, allowed=[False] * len(docs)) == []